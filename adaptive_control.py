@@ -0,0 +1,67 @@
+# adaptive_control.py
+
+import threading
+
+# --- Configuration ---
+TARGET_FRAME_MS = 80.0     # Recognition time per frame the controller aims for
+MAX_DETECTION_INTERVAL = 6 # Never skip detection on more frames than this
+MIN_FACE_PIXELS = 40       # Faces smaller than this (in the detection image) count as "small"
+ADJUST_EVERY = 15          # Frames between adjustments
+SMOOTHING = 0.2            # Weight of the newest sample in the moving average
+# Detection resolution ladder, cheapest first: (downscale factor, number_of_times_to_upsample)
+RESOLUTION_LEVELS = [(0.2, 0), (0.25, 0), (0.25, 1), (0.33, 1), (0.5, 1)]
+START_LEVEL = 2            # (0.25, 1): the scanner's fixed setting before the controller existed
+# ---------------------
+
+class AdaptiveController:
+    """Tunes detection frequency and resolution to keep recognition near a time budget.
+
+    Over budget it first detects less often, then lowers the detection resolution.
+    Under budget it spends the headroom on resolution when faces are small or absent
+    (so distant faces can be found) and on detecting every frame otherwise.
+    """
+
+    def __init__(self, target_ms=TARGET_FRAME_MS, level=START_LEVEL):
+        self.target_ms = target_ms
+        self.level = level
+        self.detection_interval = 1
+        self.average_ms = None
+        self._frames = 0
+        self._small_or_absent = 0
+        self._lock = threading.Lock()
+
+    def settings(self):
+        """Returns (scale, number_of_times_to_upsample, detection_interval)."""
+        with self._lock:
+            scale, upsample = RESOLUTION_LEVELS[self.level]
+            return scale, upsample, self.detection_interval
+
+    def record(self, seconds, face_heights):
+        """Feeds one frame's recognition time and the heights (detection-image pixels) of its faces."""
+        ms = 1000.0 * seconds
+        with self._lock:
+            self.average_ms = ms if self.average_ms is None else (1 - SMOOTHING) * self.average_ms + SMOOTHING * ms
+            if not face_heights or min(face_heights) < MIN_FACE_PIXELS:
+                self._small_or_absent += 1
+            self._frames += 1
+            if self._frames >= ADJUST_EVERY:
+                self._adjust(self._small_or_absent * 2 > self._frames)
+                self._frames = 0
+                self._small_or_absent = 0
+
+    def _adjust(self, want_resolution):
+        if self.average_ms > 1.2 * self.target_ms:
+            if self.detection_interval < MAX_DETECTION_INTERVAL:
+                self.detection_interval += 1
+            elif self.level > 0:
+                self.level -= 1
+        elif self.average_ms < 0.6 * self.target_ms:
+            if want_resolution and self.level < len(RESOLUTION_LEVELS) - 1:
+                self.level += 1
+            elif self.detection_interval > 1:
+                self.detection_interval -= 1
+
+    def __str__(self):
+        scale, upsample, interval = self.settings()
+        average = f"{self.average_ms:.0f} ms" if self.average_ms is not None else "-"
+        return f"scale {scale:.2f} | upsample {upsample} | detect 1/{interval} | {average} / {self.target_ms:.0f} ms"
@@ -0,0 +1,219 @@
+# ann_index.py
+
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+import numpy as np
+from face_matcher import GalleryMatcher, TOLERANCE
+from encodings_store import STORE_DIR, load_store
+
+# --- Configuration ---
+ANN_INDEX_FILE = os.path.join(STORE_DIR, "ivf_index.npz")   # Persisted next to the encodings
+IVF_NPROBE = 8                         # Inverted lists scanned per query
+KMEANS_ITERATIONS = 20
+KMEANS_TRAIN_PER_LIST = 256            # Training sample size per coarse centroid
+# ---------------------
+
+def default_nlist(gallery_size):
+    """Roughly sqrt(N) inverted lists, the usual IVF starting point."""
+    return max(1, int(np.sqrt(gallery_size)))
+
+def gallery_fingerprint(gallery, names):
+    """Identifies the gallery an index was built for, so a stale index is never used."""
+    sha = hashlib.sha1()
+    sha.update(np.ascontiguousarray(gallery, dtype=np.float32).tobytes())
+    sha.update("\n".join(names).encode("utf-8"))
+    return sha.hexdigest()
+
+def _assign(points, centroids, chunk=8192):
+    """Returns the nearest centroid of every point, in chunks to bound memory."""
+    coarse = GalleryMatcher(centroids, range(len(centroids)))
+    labels = np.empty(len(points), dtype=np.intp)
+    for start in range(0, len(points), chunk):
+        labels[start:start + chunk] = np.argmin(coarse.distances(points[start:start + chunk]), axis=1)
+    return labels
+
+def kmeans(points, k, iterations=KMEANS_ITERATIONS, seed=0):
+    """Plain Lloyd's k-means; empty clusters are re-seeded from random points."""
+    rng = np.random.default_rng(seed)
+    centroids = points[rng.choice(len(points), size=k, replace=False)].copy()
+
+    for _ in range(iterations):
+        labels = _assign(points, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, points)
+        counts = np.bincount(labels, minlength=k)
+
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        if empty.any():
+            centroids[empty] = points[rng.choice(len(points), size=int(empty.sum()), replace=False)]
+    return centroids
+
+
+class IVFMatcher(GalleryMatcher):
+    """Inverted-file approximate nearest-neighbour matcher.
+
+    The gallery is partitioned by k-means into nlist cells; a query is compared
+    exactly only with the samples of its nprobe closest cells.
+    """
+
+    def __init__(self, encodings, names, tolerance=TOLERANCE, nprobe=IVF_NPROBE):
+        super().__init__(encodings, names, tolerance)
+        self.nprobe = nprobe
+        self.centroids = None
+        self.order = None     # Gallery rows grouped by cell
+        self.offsets = None   # Cell c owns order[offsets[c]:offsets[c + 1]]
+        self.fingerprint = gallery_fingerprint(self.gallery, self.names)
+
+    def build(self, nlist=None, seed=0):
+        nlist = min(nlist or default_nlist(len(self)), len(self))
+        sample_size = min(len(self), nlist * KMEANS_TRAIN_PER_LIST)
+        sample = self.gallery[np.random.default_rng(seed).choice(len(self), size=sample_size, replace=False)]
+
+        self.centroids = kmeans(sample, nlist, seed=seed)
+        self._set_lists(_assign(self.gallery, self.centroids))
+        return self
+
+    def _set_lists(self, labels):
+        self.order = np.argsort(labels, kind="stable")
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=len(self.centroids)))])
+
+    def save(self, path=ANN_INDEX_FILE):
+        # A unique temp file: the encoder and a scanner rebuilding a stale index may save at once.
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_file = tempfile.mkstemp(suffix=".npz", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, centroids=self.centroids, order=self.order, offsets=self.offsets,
+                         fingerprint=np.array(self.fingerprint))
+            os.replace(tmp_file, path)
+        except BaseException:
+            os.remove(tmp_file)
+            raise
+
+    def load(self, path=ANN_INDEX_FILE):
+        """Loads a persisted index; returns False if it is missing or was built for another gallery."""
+        if not os.path.exists(path):
+            return False
+        try:
+            with np.load(path) as data:
+                if str(data["fingerprint"]) != self.fingerprint:
+                    return False
+                self.centroids = data["centroids"]
+                self.order = data["order"]
+                self.offsets = data["offsets"]
+        except Exception as e:
+            print(f"[WARN] Could not read {path} ({e}).")
+            return False
+        return True
+
+    def search(self, face_encodings):
+        if len(face_encodings) == 0 or len(self) == 0:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)
+
+        queries = np.asarray(face_encodings, dtype=np.float32).reshape(-1, 128)
+        cell_dist = GalleryMatcher(self.centroids, range(len(self.centroids))).distances(queries)
+        nprobe = min(self.nprobe, len(self.centroids))
+        probes = np.argpartition(cell_dist, nprobe - 1, axis=1)[:, :nprobe]
+
+        best = np.empty(len(queries), dtype=np.intp)
+        best_dist = np.full(len(queries), np.inf, dtype=np.float32)
+        for i, query in enumerate(queries):
+            rows = np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in probes[i]])
+            if len(rows) == 0:
+                best[i] = 0
+                continue
+            diff = self.gallery[rows] - query
+            sample_dist = np.sqrt(np.einsum('ij,ij->i', diff, diff))
+            j = np.argmin(sample_dist)
+            best[i] = rows[j]
+            best_dist[i] = sample_dist[j]
+        return best, best_dist
+
+
+def load_or_build_index(encodings, names, tolerance=TOLERANCE, path=ANN_INDEX_FILE):
+    """Returns an IVFMatcher, reusing the persisted index when it matches the gallery."""
+    matcher = IVFMatcher(encodings, names, tolerance)
+    if len(matcher) == 0 or matcher.load(path):
+        return matcher
+
+    print("[INFO] ANN index missing or stale. Building it now...")
+    matcher.build()
+    matcher.save(path)
+    return matcher
+
+
+def build_ann_index(encodings, names, path=ANN_INDEX_FILE):
+    """Builds and persists the index for a freshly written encodings store."""
+    if len(names) == 0:
+        return None
+    matcher = IVFMatcher(encodings, names).build()
+    matcher.save(path)
+    print(f"[INFO] ANN index saved to {path} ({len(matcher.centroids)} lists)")
+    return matcher
+
+
+def benchmark(gallery, names, queries, nlist=None, nprobe=IVF_NPROBE, repeats=3):
+    """Recall@1 and per-query latency of the IVF index against brute force."""
+    exact = GalleryMatcher(gallery, names)
+    start = time.perf_counter()
+    ivf = IVFMatcher(gallery, names, nprobe=nprobe).build(nlist)
+    build_seconds = time.perf_counter() - start
+
+    timings = {}
+    results = {}
+    for label, matcher in (("brute_force", exact), ("ivf", ivf)):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            best, _ = matcher.search(queries)
+        timings[label] = 1000.0 * (time.perf_counter() - start) / (repeats * len(queries))
+        results[label] = best
+
+    return {
+        "gallery": len(exact),
+        "queries": len(queries),
+        "nlist": len(ivf.centroids),
+        "nprobe": nprobe,
+        "build_seconds": build_seconds,
+        "recall_at_1": float(np.mean(results["brute_force"] == results["ivf"])),
+        "brute_force_ms_per_query": timings["brute_force"],
+        "ivf_ms_per_query": timings["ivf"],
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Recall@1 and latency of the IVF index vs brute force.")
+    parser.add_argument("--store", default=STORE_DIR, help="encodings store to index")
+    parser.add_argument("--synthetic", type=int, default=0,
+                        help="ignore --store and benchmark N random clustered encodings instead")
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--nprobe", type=int, default=IVF_NPROBE)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.synthetic:
+        # Five noisy samples around each synthetic student, like the real Data_Set.
+        students = rng.normal(0.0, 0.1, size=(max(1, args.synthetic // 5), 128)).astype(np.float32)
+        owner = rng.integers(0, len(students), size=args.synthetic)
+        gallery = students[owner] + rng.normal(0.0, 0.03, size=(args.synthetic, 128)).astype(np.float32)
+        names = [str(o) for o in owner]
+    else:
+        gallery, names, _ = load_store(args.store)
+
+    if gallery is None or len(gallery) == 0:
+        raise SystemExit("[ERROR] Empty gallery.")
+
+    picks = rng.integers(0, len(gallery), size=args.queries)
+    queries = gallery[picks] + rng.normal(0.0, 0.02, size=(args.queries, 128)).astype(np.float32)
+
+    report = benchmark(gallery, names, queries, args.nlist, args.nprobe)
+    print(f"--- IVF benchmark: {report['gallery']} encodings, {report['queries']} queries ---")
+    print(f"nlist={report['nlist']} nprobe={report['nprobe']} | build {report['build_seconds']:.2f} s")
+    print(f"Brute force: {report['brute_force_ms_per_query']:.4f} ms/query")
+    print(f"IVF        : {report['ivf_ms_per_query']:.4f} ms/query")
+    print(f"Recall@1   : {report['recall_at_1']:.2%}")
@@ -0,0 +1,220 @@
+# attendance_journal.py
+#
+# Append-only CSV journal of attendance events. The scanner hands records to a
+# background writer thread that appends them in batches; the Excel report is only
+# produced on demand by export_to_excel().
+
+import argparse
+import csv
+import os
+import queue
+import threading
+import time
+import pandas as pd
+from datetime import datetime
+from excel_export import write_excel_atomic
+
+# --- Configuration ---
+JOURNAL_FILE = "attendance_journal.csv"
+ATTENDANCE_FILE = "attendance_report.xlsx"
+FSYNC_POLICY = "batch"   # "always" = after every record, "batch" = after every batch, "never" = leave it to the OS
+BATCH_SIZE = 64          # Max records per write
+FLUSH_INTERVAL = 0.5     # Seconds the writer waits to fill a batch
+# ---------------------
+
+COLUMNS = ["Ticket Number", "Name", "Department", "Section", "Date", "Day", "Time", "Status", "Type"]
+
+def read_records(journal_file=JOURNAL_FILE):
+    """Returns every journaled record as a list of dicts (skipping a torn last line)."""
+    if not os.path.exists(journal_file):
+        return []
+    with open(journal_file, newline="", encoding="utf-8") as f:
+        return [row for row in csv.DictReader(f) if None not in row.values()]
+
+def read_records_for_date(date_string, journal_file=JOURNAL_FILE, block_size=65536):
+    """Returns the journal's records for one date, reading backwards from the end.
+
+    The journal is appended in time order, so reading stops at the first row of an
+    earlier date: the cost depends on that day's rows, not on the whole history.
+    """
+    if not os.path.exists(journal_file):
+        return []
+
+    records = []
+    with open(journal_file, "rb") as f:
+        header = next(csv.reader([f.readline().decode("utf-8")]), None)
+        if not header:
+            return []
+        header_end = f.tell()
+        position = f.seek(0, os.SEEK_END)
+        if position > header_end:
+            f.seek(position - 1)
+            skip_last = f.read(1) != b"\n"   # A torn last line (crash mid-write)
+        tail = b""
+        while position > header_end:
+            size = min(block_size, position - header_end)
+            position -= size
+            f.seek(position)
+            lines = (f.read(size) + tail).split(b"\n")
+            # The first piece may be the end of a line that starts in the previous block.
+            tail = lines.pop(0) if position > header_end else b""
+            for line in reversed(lines):
+                if skip_last:
+                    skip_last = False
+                    continue
+                text = line.decode("utf-8").rstrip("\r")
+                if not text:
+                    continue
+                row = next(csv.reader([text]))
+                if len(row) != len(header):
+                    continue
+                record = dict(zip(header, row))
+                if record["Date"] < date_string:
+                    return records[::-1]
+                if record["Date"] == date_string:
+                    records.append(record)
+    return records[::-1]
+
+def import_excel_report(journal_file=JOURNAL_FILE, excel_file=ATTENDANCE_FILE):
+    """Seeds a new journal with the rows of an existing Excel report so no history is lost."""
+    if os.path.exists(journal_file) or not os.path.exists(excel_file):
+        return 0
+
+    try:
+        existing_df = pd.read_excel(excel_file, engine='openpyxl', dtype=str)
+    except ValueError:
+        print(f"[WARN] Existing {excel_file} is corrupted or empty. Starting a new journal.")
+        return 0
+
+    existing_df = existing_df.reindex(columns=COLUMNS).fillna("")
+    with open(journal_file, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(existing_df.to_dict("records"))
+    print(f"[INFO] Imported {len(existing_df)} rows from {excel_file} into {journal_file}")
+    return len(existing_df)
+
+def export_to_excel(journal_file=JOURNAL_FILE, excel_file=ATTENDANCE_FILE):
+    """Writes the Excel report from the journal. Returns the number of rows exported."""
+    records = read_records(journal_file)
+    report_df = pd.DataFrame(records, columns=COLUMNS)
+
+    write_excel_atomic(report_df, excel_file)
+    print(f"[INFO] Exported {len(records)} attendance rows to {excel_file}")
+    return len(records)
+
+
+class DuplicateIndex:
+    """In-memory set of (Ticket Number, Date, Type) keys logged today.
+
+    Seeded once from today's journal rows; afterwards a duplicate check is a set
+    lookup and never touches the disk. The set is emptied when the date rolls over.
+    """
+
+    def __init__(self, journal_file=JOURNAL_FILE, today=None):
+        self._lock = threading.Lock()
+        self._date = today or datetime.now().strftime("%Y-%m-%d")
+        self._seen = {
+            (record["Ticket Number"], record["Date"], record["Type"])
+            for record in read_records_for_date(self._date, journal_file)
+        }
+
+    def __len__(self):
+        return len(self._seen)
+
+    def add(self, student_id, date_string, status_type):
+        """Records the key; returns False if it was already logged (a duplicate)."""
+        key = (student_id, date_string, status_type)
+        with self._lock:
+            if date_string != self._date:
+                # Midnight rollover: yesterday's keys can never match again.
+                self._date = date_string
+                self._seen = set()
+            if key in self._seen:
+                return False
+            self._seen.add(key)
+            return True
+
+
+class AttendanceJournal:
+    """Background writer that appends attendance records to the CSV journal."""
+
+    def __init__(self, journal_file=JOURNAL_FILE, fsync_policy=FSYNC_POLICY,
+                 batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL, seed_from_report=True):
+        self.journal_file = journal_file
+        self.fsync_policy = fsync_policy
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="AttendanceJournal", daemon=True)
+
+        if seed_from_report:
+            import_excel_report(journal_file)
+        self._thread.start()
+
+    def write(self, record):
+        """Queues a record (dict keyed by COLUMNS); returns immediately."""
+        self._queue.put(record)
+
+    def close(self):
+        """Flushes everything queued so far and stops the writer thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _open(self):
+        new_file = not os.path.exists(self.journal_file) or os.path.getsize(self.journal_file) == 0
+        torn_line = False
+        if not new_file:
+            with open(self.journal_file, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                torn_line = f.read(1) != b"\n"
+
+        f = open(self.journal_file, "a", newline="", encoding="utf-8")
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        if new_file:
+            writer.writeheader()
+        elif torn_line:
+            # The process died mid-record; end that line so the next record starts clean.
+            f.write("\r\n")
+        return f, writer
+
+    def _sync(self, f):
+        f.flush()
+        os.fsync(f.fileno())
+
+    def _run(self):
+        f, writer = self._open()
+        try:
+            running = True
+            while running:
+                batch = [self._queue.get()]
+                deadline = time.monotonic() + self.flush_interval
+                while batch[-1] is not None and len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                    except queue.Empty:
+                        break
+
+                if batch[-1] is None:
+                    running = False
+                    batch.pop()
+
+                for record in batch:
+                    writer.writerow(record)
+                    if self.fsync_policy == "always":
+                        self._sync(f)
+                if batch and self.fsync_policy == "batch":
+                    self._sync(f)
+                elif batch:
+                    f.flush()
+        finally:
+            f.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export the attendance journal to the Excel report.")
+    parser.add_argument("--journal", default=JOURNAL_FILE)
+    parser.add_argument("--output", default=ATTENDANCE_FILE)
+    args = parser.parse_args()
+
+    export_to_excel(args.journal, args.output)
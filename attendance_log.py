@@ -1,55 +1,93 @@
 # attendance_log.py (FINAL & CORRECTED LOGIC: Logs "---" outside valid window)
 
-import face_recognition
 import cv2
-import numpy as np
-import pickle
-import pandas as pd
 from datetime import datetime, time as time_function
-import os
+import threading
 import time
 from tkinter import messagebox 
+from face_matcher import MATCH_STRATEGY, build_matcher
+from encodings_store import load_store, migrate_legacy_pickle, read_current
+from gallery_watcher import GalleryWatcher
+from scanner_pipeline import FrameGrabber, LatencyStats, RecognitionPool
+from frame_recognizer import FrameRecognizer
+from adaptive_control import AdaptiveController
+from motion_gate import MotionGate
+from scanner_metrics import disable_metrics, enable_metrics, get_metrics
+from attendance_journal import JOURNAL_FILE, AttendanceJournal, DuplicateIndex, export_to_excel
+from student_registry import get_registry
 
 # --- Configuration ---
-ENCODINGS_FILE = "encodings.pkl"
-ATTENDANCE_FILE = "attendance_report.xlsx"
+EXPORT_ON_EXIT = True # Refresh attendance_report.xlsx from the journal when the scanner closes
 TOLERANCE = 0.6 
+ADAPTIVE_CONTROL = True       # Tune detection rate/resolution to adaptive_control.TARGET_FRAME_MS
+MOTION_GATING = True          # Skip detection on unchanged frames (sensitivity: motion_gate.py)
+METRICS_ENABLED = False       # Record hot-path timings/counters (see scanner_metrics.py)
+METRICS_HTTP_PORT = None      # e.g. 9108 to serve Prometheus text on 127.0.0.1
 
 # Time thresholds for Check-in/Check-out logic
 CHECK_IN_START = time_function(9, 30, 0)
 CHECK_IN_END = time_function(10, 0, 0)
 CHECK_OUT_START = time_function(16, 30, 0) # 4:30 PM
 CHECK_OUT_END = time_function(17, 30, 0)   # 5:30 PM
+
+# Log debounce (per student). Matches are confirmed by the tracker first
+# (face_tracker.CONFIRM_MATCHES agreeing encodings of the same face).
+LOG_COOLDOWN = 30.0   # Seconds a logged student is not logged again
 # ---------------------
 
-def load_encodings():
-    """Loads pre-calculated face encodings."""
+_journal = None
+_duplicates = None
+_journal_lock = threading.Lock()
+
+def load_encodings(report_errors=True):
+    """Maps the pre-calculated face encodings from the encodings store.
+
+    With report_errors=False problems are only printed, for callers off the Tk thread.
+    """
+    def report(message):
+        if report_errors:
+            messagebox.showerror("Error", message)
+        else:
+            print(f"[ERROR] {message}")
+
     try:
-        with open(ENCODINGS_FILE, "rb") as f:
-            data = pickle.load(f)
-            return data["encodings"], data["names"]
-    except FileNotFoundError:
-        messagebox.showerror("Error", "Encoding file not found. Run registration first.")
-        return None, None
+        encodings, names, _ = load_store()
+        if encodings is None and migrate_legacy_pickle():
+            encodings, names, _ = load_store()
+        if encodings is None:
+            report("Encoding file not found. Run registration first.")
+            return None, None
+        return encodings, names
     except Exception as e:
-        messagebox.showerror("Error", f"Failed to load encodings: {e}")
+        report(f"Failed to load encodings: {e}")
         return None, None
 
+def open_gallery(report_errors=True):
+    """Loads the gallery and starts a GalleryWatcher on it; returns None if there are no encodings."""
+    # Read before loading: if the store changes in between, the watcher reloads it.
+    loaded_version = read_current()
+    Known_Faces_Encodings, Known_Faces_Names = load_encodings(report_errors)
+    
+    if Known_Faces_Encodings is None or len(Known_Faces_Encodings) == 0:
+        print("[ERROR] No face encodings loaded.")
+        return None
+
+    # Built once: the gallery matrix is reused for every face in every frame.
+    # The watcher swaps in a new matcher when encode_faces publishes new enrollments.
+    return GalleryWatcher(
+        lambda encodings, names: build_matcher(encodings, names, MATCH_STRATEGY, TOLERANCE),
+        build_matcher(Known_Faces_Encodings, Known_Faces_Names, MATCH_STRATEGY, TOLERANCE),
+        loaded_version,
+    ).start()
+
 
 def log_attendance(name):
     """Logs the attendance using the strict time windows defined in the configuration."""
+    log_start = time.perf_counter()
     
-    # 1. Parse Student Data (robust split fix)
-    parts = name.split('_')
-    
-    if len(parts) < 4:
-        student_id, student_name, dept, section = name, name, "N/A", "N/A"
-    else:
-        section = parts[-1] 
-        dept = parts[-2]
-        student_id = parts[0]
-        name_parts = parts[1:-2] 
-        student_name = " ".join(name_parts)
+    # 1. Look up Student Data (registry, falling back to the folder name)
+    student = get_registry().lookup(name)
+    student_id, student_name, dept, section = student.ticket, student.name, student.department, student.section
         
     now = datetime.now()
     date_string = now.strftime("%Y-%m-%d")
@@ -74,7 +112,7 @@ def log_attendance(name):
     # ------------------------
         
     # 3. Prepare new record
-    new_record = pd.DataFrame([{
+    new_record = {
         "Ticket Number": student_id,
         "Name": student_name,
         "Department": dept,
@@ -84,116 +122,193 @@ def log_attendance(name):
         "Time": time_string,
         "Status": attendance_status,
         "Type": status_type
-    }])
+    }
     
     # 4. Check for duplicates 
-    existing_df = pd.DataFrame()
-    if os.path.exists(ATTENDANCE_FILE):
-        try:
-            existing_df = pd.read_excel(ATTENDANCE_FILE, engine='openpyxl')
-        except ValueError:
-             print(f"[WARN] Existing attendance file is corrupted or empty. Starting new.")
-        except Exception:
-             pass 
-
     # Check if this student already has this specific STATUS_TYPE logged today
     # Note: If status_type is "---", it will only check for other "---" entries, 
     # effectively preventing duplicates outside the official windows.
-    is_duplicate = False
-    if not existing_df.empty:
-        is_duplicate = existing_df[
-            (existing_df['Ticket Number'] == student_id) & 
-            (existing_df['Date'] == date_string) &
-            (existing_df['Type'] == status_type) 
-        ].any().any()
+    journal, duplicates = get_journal()
+    is_duplicate = not duplicates.add(student_id, date_string, status_type)
         
-    # 5. Write to Excel
+    metrics = get_metrics()
+    if metrics is not None:
+        metrics.inc("duplicates_suppressed" if is_duplicate else "log_writes")
+
+    # 5. Append to the journal (written by a background thread)
     if not is_duplicate:
-        if existing_df.empty:
-            updated_df = new_record
-        else:
-            updated_df = pd.concat([existing_df, new_record], ignore_index=True)
-            
-        updated_df.to_excel(ATTENDANCE_FILE, index=False, engine='openpyxl')
+        journal.write(new_record)
+        if metrics is not None:
+            metrics.observe_stage("log", time.perf_counter() - log_start)
         print(f"[LOG] {student_name} marked as {status_type}")
         return f"{student_name} - Status: {status_type}"
     else:
         return f"{student_name} already logged for {status_type} today."
 
-def run_attendance_system():
-    """Starts the webcam and real-time recognition loop."""
-    Known_Faces_Encodings, Known_Faces_Names = load_encodings()
-    
-    if Known_Faces_Encodings is None or len(Known_Faces_Encodings) == 0:
-        print("[ERROR] No face encodings loaded.")
+def open_journal(journal_file=JOURNAL_FILE):
+    """Starts the shared journal writer on journal_file (the real attendance journal by default)."""
+    global _journal, _duplicates
+    with _journal_lock:
+        if _journal is None:
+            _journal = AttendanceJournal(journal_file, seed_from_report=journal_file == JOURNAL_FILE)
+            # Seeded after the journal so rows imported from an old Excel report count.
+            _duplicates = DuplicateIndex(journal_file)
+        return _journal, _duplicates
+
+def get_journal():
+    """Returns the shared journal writer and today's duplicate index, starting them on first use."""
+    return open_journal()
+
+def close_journal():
+    """Flushes the journal and, if configured, refreshes the Excel report from it."""
+    global _journal, _duplicates
+    if _journal is not None:
+        _journal.close()
+        if EXPORT_ON_EXIT and _journal.journal_file == JOURNAL_FILE:
+            export_to_excel()
+        _journal = None
+        _duplicates = None
+
+def display_name(full_identifier):
+    """Returns the registered name for a folder identifier such as '1001_Alex_CS_A'."""
+    return get_registry().lookup(full_identifier).name
+
+def draw_faces(frame, faces):
+    """Draws the boxes and names returned by FrameRecognizer.process onto the frame."""
+    for (top, right, bottom, left), full_identifier, _, _ in faces:
+        name = display_name(full_identifier) if full_identifier is not None else "Unknown"
+        color = (0, 255, 0) if name != "Unknown" else (0, 0, 255) 
+        cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
+        cv2.putText(frame, name, (left + 6, bottom - 6), cv2.FONT_HERSHEY_DUPLEX, 1.0, (255, 255, 255), 1)
+
+class LogCooldown:
+    """Per-student cooldown before calling log_attendance.
+
+    Callers pass only confirmed matches (see FrameRecognizer), so one call is enough
+    to log a student; the student is then suppressed for LOG_COOLDOWN seconds, which
+    also covers the tracker re-verifying the same face every few seconds. Expired
+    entries are evicted, so memory stays bounded by the number of students logged in
+    the last LOG_COOLDOWN seconds.
+    """
+
+    def __init__(self, cooldown=LOG_COOLDOWN):
+        self.cooldown = cooldown
+        self._logged = {}   # identifier -> time it was last logged
+        self._last_eviction = 0.0
+
+    def __len__(self):
+        return len(self._logged)
+
+    def should_log(self, full_identifier, now=None):
+        """Records one confirmed match; returns True when the student should be logged."""
+        now = time.time() if now is None else now
+        if now - self._last_eviction >= self.cooldown:
+            self._evict(now)
+
+        logged = self._logged.get(full_identifier)
+        if logged is not None and now - logged < self.cooldown:
+            return False
+        self._logged[full_identifier] = now
+        return True
+
+    def _evict(self, now):
+        self._logged = {
+            identifier: logged for identifier, logged in self._logged.items()
+            if now - logged < self.cooldown
+        }
+        self._last_eviction = now
+
+def run_attendance_system(video_capture=None, watcher=None):
+    """Starts the webcam and real-time recognition pipeline.
+
+    A capture already opened and a watcher already started (see startup_warmup.py)
+    are used as they are; either way this function releases them when it returns.
+    """
+    if watcher is None:
+        watcher = open_gallery()
+    if watcher is None:
+        if video_capture is not None:
+            video_capture.release()
         return
 
-    video_capture = cv2.VideoCapture(0)
+    if video_capture is None or not video_capture.isOpened():
+        video_capture = cv2.VideoCapture(0)
     
     if not video_capture.isOpened():
         print("[ERROR] Could not open webcam.")
+        watcher.stop()
         return
 
+    # Journal writer, one-time Excel import and duplicate index start here, not on the
+    # first recognized student in the display loop.
+    open_journal()
     print("--- Starting Real-time Attendance --- (Press 'q' to quit)")
-    last_log_time = time.time()
-    last_logged_name = ""
+    if METRICS_ENABLED:
+        enable_metrics(http_port=METRICS_HTTP_PORT)
+    # Capture and recognition run on their own threads; this loop only displays and logs.
+    grabber = FrameGrabber(video_capture).start()
+    controller = AdaptiveController() if ADAPTIVE_CONTROL else None
+    motion_gate = MotionGate() if MOTION_GATING else None
+    recognizer = FrameRecognizer(lambda: watcher.matcher, controller=controller, motion_gate=motion_gate)
+    pool = RecognitionPool(recognizer.process).start()
+    display_stats = LatencyStats("display")
+    cooldown = LogCooldown()
     log_message = "" 
+    frame_id = -1
+    latest_result_id = -1
+    faces = []
 
     while True:
-        ret, frame = video_capture.read()
-        
-        if not ret: break
-
-        small_frame = cv2.resize(frame, (0, 0), fx=0.25, fy=0.25)
-        rgb_small_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
-
-        face_locations = face_recognition.face_locations(rgb_small_frame)
-        face_encodings = face_recognition.face_encodings(rgb_small_frame, face_locations)
-
-        face_names = []
-        for face_encoding in face_encodings:
-            matches = face_recognition.compare_faces(Known_Faces_Encodings, face_encoding, TOLERANCE)
-            name = "Unknown"
-
-            face_distances = face_recognition.face_distance(Known_Faces_Encodings, face_encoding)
-            best_match_index = np.argmin(face_distances)
-            
-            if matches[best_match_index]:
-                full_identifier = Known_Faces_Names[best_match_index]
-                
-                parts = full_identifier.split('_')
-                if len(parts) >= 4:
-                    display_name = " ".join(parts[1:-2])
-                else:
-                    display_name = full_identifier
-                    
-                name = display_name
-                
-                if full_identifier != last_logged_name or (time.time() - last_log_time) > 5:
+        frame_id, frame = grabber.wait_for_frame(frame_id)
+        if frame is None:
+            if grabber.ended:
+                break
+            continue
+
+        start = time.perf_counter()
+        pool.submit(frame_id, frame)
+
+        for result_id, result in pool.results():
+            # Every result is checked for confirmed matches: the one that did the encoding
+            # often finishes after a newer detect-only frame.
+            for _, full_identifier, _, confirmed in result:
+                if full_identifier is not None and confirmed and cooldown.should_log(full_identifier):
                     log_message = log_attendance(full_identifier)
-                    last_log_time = time.time()
-                    last_logged_name = full_identifier
-                
-            face_names.append(name)
-
-        for (top, right, bottom, left), name in zip(face_locations, face_names):
-            top *= 4
-            right *= 4
-            bottom *= 4
-            left *= 4
-            
-            color = (0, 255, 0) if name != "Unknown" else (0, 0, 255) 
-            cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
-            cv2.putText(frame, name, (left + 6, bottom - 6), cv2.FONT_HERSHEY_DUPLEX, 1.0, (255, 255, 255), 1)
+            # Workers can finish out of order; never replace newer boxes with older ones.
+            if result_id > latest_result_id:
+                latest_result_id = result_id
+                faces = result
+
+        # The grabber keeps a reference to the frame it handed out; draw on a copy.
+        frame = frame.copy()
+        draw_faces(frame, faces)
 
         if log_message:
             cv2.putText(frame, log_message, (10, frame.shape[0] - 10), cv2.FONT_HERSHEY_DUPLEX, 0.7, (255, 255, 255), 1)
 
+        overlay_lines = [str(grabber.stats), str(pool.stats), str(display_stats)]
+        if controller is not None:
+            overlay_lines.append(str(controller))
+        if motion_gate is not None:
+            overlay_lines.append(str(motion_gate))
+        for row, line in enumerate(overlay_lines):
+            cv2.putText(frame, line, (10, 20 + 18 * row), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
+
         cv2.imshow('Attendance Scanner', frame)
+        display_stats.record(time.perf_counter() - start)
 
         if cv2.waitKey(1) & 0xFF == ord('q'):
             break
 
+    grabber.stop()
+    pool.stop()
+    watcher.stop()
     video_capture.release()
     cv2.destroyAllWindows()
-    print("Attendance System Closed.")
\ No newline at end of file
+    close_journal()
+    disable_metrics()
+    print(f"Stage latency | {grabber.stats} | {pool.stats} | {display_stats}")
+    print(f"Frames dropped | capture: {grabber.dropped} | recognition: {pool.dropped}")
+    if motion_gate is not None:
+        print(f"[INFO] {motion_gate}")
+    print("Attendance System Closed.")
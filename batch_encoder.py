@@ -0,0 +1,65 @@
+# batch_encoder.py
+
+import dlib
+import face_recognition
+import numpy as np
+from face_recognition import api
+
+# --- Configuration ---
+ENCODING_MODEL = "small"   # Landmark model used by face_recognition.face_encodings by default (5 points)
+NUM_JITTERS = 1            # Same default as face_recognition.face_encodings
+# ---------------------
+
+_batch_supported = True
+
+def _landmarks(image, locations, model=ENCODING_MODEL):
+    predictor = api.pose_predictor_5_point if model == "small" else api.pose_predictor_68_point
+    shapes = dlib.full_object_detections()
+    for location in locations:
+        shapes.append(predictor(image, api._css_to_rect(location)))
+    return shapes
+
+def _disable_batching(error):
+    global _batch_supported
+    print(f"[WARN] Batched face encoding unavailable ({error}). Encoding face by face.")
+    _batch_supported = False
+
+def encode_batch(items, num_jitters=NUM_JITTERS, model=ENCODING_MODEL):
+    """Encodes the faces of several images in one call into the dlib ResNet.
+
+    items is a list of (rgb image, [(top, right, bottom, left), ...]); returns one list
+    of 128-d encodings per item, matching face_recognition.face_encodings. Landmarks
+    are predicted for every face first, then all crops go through the network as one
+    batch, which saves the per-call overhead of encoding face by face.
+    """
+    active = [(i, image, locations) for i, (image, locations) in enumerate(items) if locations]
+    results = [[] for _ in items]
+    if not active:
+        return results
+
+    if _batch_supported:
+        try:
+            images = [image for _, image, _ in active]
+            shapes = [_landmarks(image, locations, model) for _, image, locations in active]
+        except AttributeError as e:
+            # A face_recognition release without the internals used by _landmarks.
+            _disable_batching(e)
+        else:
+            if len(images) == 1:
+                descriptors = [api.face_encoder.compute_face_descriptor(images[0], shapes[0], num_jitters)]
+            else:
+                try:
+                    descriptors = api.face_encoder.compute_face_descriptor(images, shapes, num_jitters)
+                except TypeError as e:
+                    # Either this dlib build lacks the list overload or the input is bad.
+                    # Image by image tells them apart: bad input raises there as well.
+                    descriptors = [api.face_encoder.compute_face_descriptor(image, image_shapes, num_jitters)
+                                   for image, image_shapes in zip(images, shapes)]
+                    _disable_batching(e)
+            for (i, _, _), image_descriptors in zip(active, descriptors):
+                results[i] = [np.array(descriptor) for descriptor in image_descriptors]
+            return results
+
+    for i, image, locations in active:
+        results[i] = face_recognition.face_encodings(image, locations, num_jitters, model)
+    return results
@@ -0,0 +1,85 @@
+# capture_quality.py
+
+import time
+import cv2
+import face_recognition
+
+# --- Configuration ---
+CHECK_SCALE = 0.5            # Frames are checked at this scale; detection at full size is too slow
+SHARPNESS_THRESHOLD = 60.0   # Minimum Laplacian variance of the face crop (lower = blurrier)
+MIN_FACE_HEIGHT = 80         # Minimum face height in full-frame pixels
+MIN_POSE_CHANGE = 0.12       # Pose distance from every accepted image needed to count as a new pose
+POSE_TIMEOUT = 4.0           # Seconds after which a sharp frame is accepted even without a new pose
+# ---------------------
+
+class CaptureQualityChecker:
+    """Decides which registration frames are worth saving.
+
+    A frame is accepted only if it holds exactly one large enough face, the face is
+    sharp, and its pose differs from the images accepted so far, so every saved image
+    yields an encoding and adds a different view of the student.
+    """
+
+    def __init__(self, sharpness_threshold=SHARPNESS_THRESHOLD, min_pose_change=MIN_POSE_CHANGE,
+                 pose_timeout=POSE_TIMEOUT):
+        self.sharpness_threshold = sharpness_threshold
+        self.min_pose_change = min_pose_change
+        self.pose_timeout = pose_timeout
+        self.poses = []
+        self._last_accepted = time.time()
+
+    def check(self, frame):
+        """Returns (accepted, reason); reason is a short hint for the student when rejected."""
+        small_frame = cv2.resize(frame, (0, 0), fx=CHECK_SCALE, fy=CHECK_SCALE)
+        rgb_small_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
+
+        face_locations = face_recognition.face_locations(rgb_small_frame)
+        if not face_locations:
+            return False, "No face found"
+        if len(face_locations) > 1:
+            return False, "Only one person in view, please"
+
+        top, right, bottom, left = face_locations[0]
+        if (bottom - top) / CHECK_SCALE < MIN_FACE_HEIGHT:
+            return False, "Move closer to the camera"
+
+        sharpness = self.sharpness(frame, [int(v / CHECK_SCALE) for v in face_locations[0]])
+        if sharpness < self.sharpness_threshold:
+            return False, "Hold still (image is blurry)"
+
+        landmarks = face_recognition.face_landmarks(rgb_small_frame, face_locations, model="small")
+        pose = self.pose(landmarks[0]) if landmarks else None
+        now = time.time()
+        if pose is not None and self.poses and now - self._last_accepted < self.pose_timeout:
+            change = min(max(abs(a - b) for a, b in zip(pose, accepted)) for accepted in self.poses)
+            if change < self.min_pose_change:
+                return False, "Turn your head slightly"
+
+        if pose is not None:
+            self.poses.append(pose)
+        self._last_accepted = now
+        return True, "OK"
+
+    @staticmethod
+    def sharpness(frame, location):
+        """Variance of the Laplacian over the face crop."""
+        top, right, bottom, left = location
+        face = frame[max(0, top):bottom, max(0, left):right]
+        if face.size == 0:
+            return 0.0
+        gray = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY)
+        return cv2.Laplacian(gray, cv2.CV_64F).var()
+
+    @staticmethod
+    def pose(landmarks):
+        """Rough (yaw, pitch) from the 5-point landmarks, in units of the eye distance."""
+        left_eye = _mean(landmarks["left_eye"])
+        right_eye = _mean(landmarks["right_eye"])
+        nose = _mean(landmarks["nose_tip"])
+        eye_distance = max(1.0, ((right_eye[0] - left_eye[0]) ** 2 + (right_eye[1] - left_eye[1]) ** 2) ** 0.5)
+        centre = ((left_eye[0] + right_eye[0]) / 2, (left_eye[1] + right_eye[1]) / 2)
+        return (nose[0] - centre[0]) / eye_distance, (nose[1] - centre[1]) / eye_distance
+
+
+def _mean(points):
+    return sum(x for x, _ in points) / len(points), sum(y for _, y in points) / len(points)
@@ -1,59 +1,246 @@
 # encode_faces.py
 
+import argparse
 import face_recognition
+import hashlib
 import os
 import pickle
 import time
+from concurrent.futures import ProcessPoolExecutor
+from ann_index import build_ann_index
+from encodings_store import append_to_store, load_store, write_store
+from face_matcher import MATCH_STRATEGY
 
 DATA_PATH = "Data_Set"
-ENCODINGS_FILE = "encodings.pkl"
+MANIFEST_FILE = "encodings_manifest.pkl"
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+ENCODING_WORKERS = os.cpu_count() or 1   # Processes used for encoding
+ENCODING_CHUNK_SIZE = 8                  # Images handed to a worker at a time
+ENCODING_MIN_PARALLEL = 32               # Fewer images are encoded in-process (each worker loads the dlib models)
+BUILD_ANN_INDEX = MATCH_STRATEGY == "ivf"  # Rebuild encodings_store/ivf_index.npz after every run
 
-def create_encodings():
-    print("--- Starting Face Encoding Process ---")
-    start_time = time.time()
-    
-    Known_Faces_Encodings = []
-    Known_Faces_Names = []
-    
-    # Loop through every folder (each student)
-    for name in os.listdir(DATA_PATH):
+def file_signature(filepath):
+    """Returns the (size, mtime) pair used as a cheap change check."""
+    stat = os.stat(filepath)
+    return stat.st_size, stat.st_mtime_ns
+
+def file_hash(filepath):
+    """Returns the SHA-1 of the file contents."""
+    sha = hashlib.sha1()
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(65536), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+def list_images():
+    """Returns (student_folder, filepath) pairs for every image in DATA_PATH, in a stable order."""
+    images = []
+    if not os.path.isdir(DATA_PATH):
+        return images
+
+    for name in sorted(os.listdir(DATA_PATH)):
         name_path = os.path.join(DATA_PATH, name)
         if os.path.isdir(name_path):
-            print(f"Processing: {name}...")
-            
-            # Loop through every image file for the current student
-            for filename in os.listdir(name_path):
-                if filename.endswith(('.jpg', '.jpeg', '.png')):
-                    filepath = os.path.join(name_path, filename)
-                    
-                    try:
-                        image = face_recognition.load_image_file(filepath)
-                        # Find the face location
-                        face_locations = face_recognition.face_locations(image)
-                        
-                        if face_locations:
-                            # Calculate the 128-dimension encoding
-                            encoding = face_recognition.face_encodings(image, face_locations)[0]
-                            
-                            Known_Faces_Encodings.append(encoding)
-                            # Store the folder name (e.g., '1001_Alex_CS_A') as the identifier
-                            Known_Faces_Names.append(name) 
-                        else:
-                            # print(f"  [Warning] No face found in {filename}")
-                            pass
-                            
-                    except Exception as e:
-                        print(f"  [Error] Could not process {filename}: {e}")
-
-    # Save the encodings and names to a pickle file
-    data = {"encodings": Known_Faces_Encodings, "names": Known_Faces_Names}
-    with open(ENCODINGS_FILE, "wb") as f:
-        f.write(pickle.dumps(data))
+            for filename in sorted(os.listdir(name_path)):
+                if filename.endswith(IMAGE_EXTENSIONS):
+                    images.append((name, os.path.join(name_path, filename)))
+    return images
+
+def encode_image(filepath):
+    """Returns the 128-d encoding of the first face in the image, or None if no face is found."""
+    image = face_recognition.load_image_file(filepath)
+    # Find the face location
+    face_locations = face_recognition.face_locations(image)
+
+    if face_locations:
+        # Calculate the 128-dimension encoding
+        return face_recognition.face_encodings(image, face_locations)[0]
+    return None
+
+def _encode_worker(filepath):
+    """Process-pool task: never raises, so one bad image cannot abort the batch."""
+    try:
+        return filepath, encode_image(filepath), None
+    except Exception as e:
+        return filepath, None, str(e)
+
+def encode_images(filepaths, workers=ENCODING_WORKERS, chunk_size=ENCODING_CHUNK_SIZE):
+    """Encodes the images and yields (filepath, encoding, error) in input order.
+
+    Work is spread over a process pool in chunks of chunk_size images. With a single
+    worker, or fewer than ENCODING_MIN_PARALLEL images (e.g. one registration),
+    everything runs in this process: starting workers that each load the dlib models
+    would cost more than the encoding itself.
+    """
+    workers = max(1, min(workers, len(filepaths)))
+    if workers == 1 or len(filepaths) < ENCODING_MIN_PARALLEL:
+        for filepath in filepaths:
+            yield _encode_worker(filepath)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # map() keeps results in submission order, so the merge is deterministic.
+        yield from executor.map(_encode_worker, filepaths, chunksize=max(1, chunk_size))
+
+def load_manifest():
+    """Loads the manifest of already-encoded files.
+
+    Returns ({filepath: entry}, store), where each entry holds the file's name, size,
+    mtime, hash and its row in the encodings store (None if the image has no face),
+    and store is the {"generation", "count"} of the store those rows refer to.
+    """
+    if not os.path.exists(MANIFEST_FILE):
+        return {}, None
+    try:
+        with open(MANIFEST_FILE, "rb") as f:
+            manifest = pickle.load(f)
+    except Exception as e:
+        print(f"[WARN] Could not read {MANIFEST_FILE} ({e}). Re-encoding everything.")
+        return {}, None
+
+    if not isinstance(manifest, dict) or "files" not in manifest:
+        # Older manifests carried a copy of every encoding instead of store rows.
+        print(f"[WARN] {MANIFEST_FILE} is in an older format. Re-encoding everything.")
+        return {}, None
+    return manifest["files"], manifest["store"]
+
+def save_manifest(files, current):
+    """Writes the manifest atomically so a crash never leaves a half-written file."""
+    manifest = {
+        "store": {"generation": current["generation"], "count": current["count"]},
+        "files": files,
+    }
+    tmp_file = MANIFEST_FILE + ".tmp"
+    with open(tmp_file, "wb") as f:
+        f.write(pickle.dumps(manifest))
+    os.replace(tmp_file, MANIFEST_FILE)
+
+def create_encodings(incremental=False, workers=ENCODING_WORKERS, chunk_size=ENCODING_CHUNK_SIZE, progress=None):
+    """Builds the encodings store from DATA_PATH.
+
+    With incremental=True only images that are new or changed since the last run
+    (according to the manifest) are encoded; entries for deleted images and folders
+    are dropped and the encodings of everything else are read back from the store.
+    When the run only added images, the new rows are appended to the store instead
+    of rewriting it.
+
+    progress, if given, is called as progress(done, total) after each image that had
+    to be encoded; it runs on the calling thread.
+    """
+    print("--- Starting Face Encoding Process ---")
+    start_time = time.time()
+
+    old_manifest, manifest_store = load_manifest() if incremental else ({}, None)
+    store_encodings, store_names, current = load_store()
+    if old_manifest and (current is None or manifest_store is None or
+                         (current["generation"], current["count"]) != (manifest_store["generation"], manifest_store["count"])):
+        # The rows no longer line up with the manifest (e.g. the store was rebuilt elsewhere).
+        print(f"[WARN] The encodings store changed since {MANIFEST_FILE} was written. Re-encoding everything.")
+        old_manifest = {}
+
+    manifest = {}
+    pending = {}
+    reused = 0
+    encoded = 0
+    failed = 0
+
+    for name, filepath in list_images():
+        size, mtime = file_signature(filepath)
+        entry = old_manifest.get(filepath)
+
+        if entry is not None and entry["name"] == name:
+            if (entry["size"], entry["mtime"]) == (size, mtime):
+                manifest[filepath] = entry
+                reused += 1
+                continue
+
+            # Size or mtime changed: only re-encode if the contents really did.
+            content_hash = file_hash(filepath)
+            if entry["hash"] == content_hash:
+                manifest[filepath] = dict(entry, size=size, mtime=mtime)
+                reused += 1
+                continue
+        else:
+            content_hash = file_hash(filepath)
+
+        # Reserve the slot now so the store keeps the DATA_PATH order after the merge.
+        manifest[filepath] = None
+        pending[filepath] = {"name": name, "size": size, "mtime": mtime, "hash": content_hash}
+
+    if pending:
+        print(f"Encoding {len(pending)} image(s) with up to {workers} worker(s)...")
+
+    new_encodings = {}
+    for done, (filepath, encoding, error) in enumerate(encode_images(list(pending), workers, chunk_size), 1):
+        if progress is not None:
+            progress(done, len(pending))
+        if error is not None:
+            print(f"  [Error] Could not process {filepath}: {error}")
+            del manifest[filepath]
+            failed += 1
+            continue
+
+        # A row of None means the image was read fine but had no face; kept so it is not retried.
+        manifest[filepath] = dict(pending[filepath], row=None)
+        if encoding is not None:
+            new_encodings[filepath] = encoding
+        encoded += 1
+
+    removed = len(set(old_manifest) - set(manifest))
+
+    New_Encodings = list(new_encodings.values())
+    # Store the folder name (e.g., '1001_Alex_CS_A') as the identifier
+    New_Names = [manifest[filepath]["name"] for filepath in new_encodings]
+    reused_faces = sum(1 for filepath, entry in manifest.items()
+                       if filepath not in pending and entry["row"] is not None)
+
+    # Appending is only safe if nothing was removed or replaced and the store
+    # still holds exactly the rows the old manifest describes.
+    only_additions = removed == 0 and not any(filepath in old_manifest for filepath in pending)
+    append = incremental and only_additions and current is not None and current["count"] == reused_faces
+
+    if append:
+        for row, filepath in enumerate(new_encodings, current["count"]):
+            manifest[filepath]["row"] = row
+        if BUILD_ANN_INDEX:
+            # Saved before CURRENT is published, so a scanner reloading the new store finds a
+            # matching index instead of rebuilding it. Rows are indexed in store order, which
+            # differs from DATA_PATH order after appends.
+            build_ann_index(list(store_encodings) + New_Encodings, store_names + New_Names)
+        current = append_to_store(New_Encodings, New_Names)
+    else:
+        Known_Faces_Encodings = []
+        Known_Faces_Names = []
+        for filepath, entry in manifest.items():
+            if filepath in new_encodings:
+                encoding = new_encodings[filepath]
+            elif filepath not in pending and entry["row"] is not None:
+                encoding = store_encodings[entry["row"]]
+            else:
+                continue
+            entry["row"] = len(Known_Faces_Encodings)
+            Known_Faces_Encodings.append(encoding)
+            Known_Faces_Names.append(entry["name"])
+
+        if BUILD_ANN_INDEX:
+            build_ann_index(Known_Faces_Encodings, Known_Faces_Names)
+        current = write_store(Known_Faces_Encodings, Known_Faces_Names)
+    save_manifest(manifest, current)
 
     end_time = time.time()
     print("\n[SUCCESS] Encoding complete!")
-    print(f"Total encoded faces: {len(Known_Faces_Encodings)}")
+    print(f"Images encoded: {encoded} | reused: {reused} | removed: {removed} | failed: {failed}")
+    print(f"Total encoded faces: {current['count']}")
     print(f"Time taken: {round(end_time - start_time, 2)} seconds")
-    
+
 if __name__ == '__main__':
-    create_encodings()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Build the face encodings store from the Data_Set folder.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only encode images that are new or changed since the last run")
+    parser.add_argument("--workers", type=int, default=ENCODING_WORKERS,
+                        help=f"number of encoding processes (default: {ENCODING_WORKERS})")
+    parser.add_argument("--chunk-size", type=int, default=ENCODING_CHUNK_SIZE,
+                        help=f"images handed to a worker at a time (default: {ENCODING_CHUNK_SIZE})")
+    args = parser.parse_args()
+
+    create_encodings(incremental=args.incremental, workers=args.workers, chunk_size=args.chunk_size)
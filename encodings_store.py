@@ -0,0 +1,157 @@
+# encodings_store.py
+#
+# Versioned, memory-mappable encodings store.
+#
+#   encodings_store/
+#       CURRENT            JSON pointer: format version, generation, row count, name bytes
+#       gen-000001.f32     raw float32 matrix, one 128-d row per encoding
+#       gen-000001.names   identity table, one folder name per line (row order)
+#
+# Readers map only the first `count` rows, so the encoder can append rows and then
+# publish them by rewriting CURRENT. A full rebuild writes a new generation and swaps
+# CURRENT with os.replace, so a reader always sees a complete store.
+
+import json
+import os
+import pickle
+import numpy as np
+
+# --- Configuration ---
+STORE_DIR = "encodings_store"
+LEGACY_ENCODINGS_FILE = "encodings.pkl"
+STORE_FORMAT_VERSION = 1
+ENCODING_DIM = 128
+# ---------------------
+
+CURRENT_FILE = "CURRENT"
+
+def _generation_paths(store_dir, generation):
+    base = os.path.join(store_dir, f"gen-{generation:06d}")
+    return base + ".f32", base + ".names"
+
+def _fsync_write(path, data, mode="wb"):
+    with open(path, mode) as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+def _publish(store_dir, current):
+    """Atomically points CURRENT at a (generation, count) pair."""
+    tmp_file = os.path.join(store_dir, CURRENT_FILE + ".tmp")
+    _fsync_write(tmp_file, json.dumps(current).encode("utf-8"))
+    os.replace(tmp_file, os.path.join(store_dir, CURRENT_FILE))
+
+def _encode_rows(encodings, names):
+    matrix = np.ascontiguousarray(np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_DIM))
+    if len(matrix) != len(names):
+        raise ValueError(f"{len(matrix)} encodings but {len(names)} names")
+    table = "".join(f"{name}\n" for name in names).encode("utf-8")
+    return matrix, table
+
+def _remove_old_generations(store_dir, keep):
+    for filename in os.listdir(store_dir):
+        if filename.startswith("gen-") and not filename.startswith(f"gen-{keep:06d}."):
+            try:
+                os.remove(os.path.join(store_dir, filename))
+            except OSError:
+                # Still mapped by a scanner (Windows); removed on a later write.
+                pass
+
+def read_current(store_dir=STORE_DIR):
+    """Returns the CURRENT pointer as a dict, or None if there is no store yet."""
+    try:
+        with open(os.path.join(store_dir, CURRENT_FILE), "rb") as f:
+            current = json.loads(f.read().decode("utf-8"))
+    except FileNotFoundError:
+        return None
+
+    if current.get("version") != STORE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported encodings store version: {current.get('version')}")
+    return current
+
+def write_store(encodings, names, store_dir=STORE_DIR):
+    """Writes a complete new generation and swaps it in atomically."""
+    os.makedirs(store_dir, exist_ok=True)
+    matrix, table = _encode_rows(encodings, names)
+
+    previous = read_current(store_dir)
+    generation = previous["generation"] + 1 if previous else 1
+    matrix_path, names_path = _generation_paths(store_dir, generation)
+    _fsync_write(matrix_path, matrix.tobytes())
+    _fsync_write(names_path, table)
+
+    current = {
+        "version": STORE_FORMAT_VERSION,
+        "generation": generation,
+        "count": len(matrix),
+        "dim": ENCODING_DIM,
+        "names_bytes": len(table),
+    }
+    _publish(store_dir, current)
+    _remove_old_generations(store_dir, generation)
+    return current
+
+def append_to_store(encodings, names, store_dir=STORE_DIR):
+    """Appends rows to the current generation, then publishes the new row count."""
+    current = read_current(store_dir)
+    if current is None:
+        return write_store(encodings, names, store_dir)
+
+    matrix, table = _encode_rows(encodings, names)
+    if len(matrix) == 0:
+        return current
+
+    matrix_path, names_path = _generation_paths(store_dir, current["generation"])
+    try:
+        for path, size, data in ((matrix_path, current["count"] * ENCODING_DIM * 4, matrix.tobytes()),
+                                 (names_path, current["names_bytes"], table)):
+            with open(path, "r+b") as f:
+                # Only a crashed append leaves bytes past the published rows. Shrinking a
+                # file that a scanner has mapped fails on Windows, so never truncate otherwise.
+                if os.fstat(f.fileno()).st_size > size:
+                    f.truncate(size)
+                f.seek(size)
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+    except OSError as e:
+        # Nothing new is published yet, so a fresh generation from the published rows is safe.
+        print(f"[WARN] Could not append to generation {current['generation']} ({e}). Writing a new one.")
+        encodings_old, names_old, _ = load_store(store_dir)
+        return write_store(np.concatenate([np.asarray(encodings_old), matrix]), names_old + list(names), store_dir)
+
+    current = dict(current, count=current["count"] + len(matrix), names_bytes=current["names_bytes"] + len(table))
+    _publish(store_dir, current)
+    return current
+
+def load_store(store_dir=STORE_DIR):
+    """Maps the published rows read-only.
+
+    Returns (encodings, names, current); encodings is an np.memmap shared with every
+    other process mapping the same generation. Returns (None, None, None) if there is
+    no store.
+    """
+    current = read_current(store_dir)
+    if current is None:
+        return None, None, None
+
+    matrix_path, names_path = _generation_paths(store_dir, current["generation"])
+    count = current["count"]
+    if count == 0:
+        encodings = np.empty((0, ENCODING_DIM), dtype=np.float32)
+    else:
+        encodings = np.memmap(matrix_path, dtype=np.float32, mode="r", shape=(count, current["dim"]))
+
+    with open(names_path, "rb") as f:
+        names = f.read(current["names_bytes"]).decode("utf-8").splitlines()
+    return encodings, names, current
+
+def migrate_legacy_pickle(pickle_file=LEGACY_ENCODINGS_FILE, store_dir=STORE_DIR):
+    """Converts an old encodings.pkl into the store. Returns True if a store was written."""
+    if not os.path.exists(pickle_file) or os.path.getsize(pickle_file) == 0:
+        return False
+    with open(pickle_file, "rb") as f:
+        data = pickle.load(f)
+    write_store(data["encodings"], data["names"], store_dir)
+    print(f"[INFO] Migrated {pickle_file} to {store_dir}/ ({len(data['names'])} encodings)")
+    return True
@@ -0,0 +1,13 @@
+# excel_export.py
+
+import os
+
+def write_excel_atomic(df, excel_file):
+    """Writes a DataFrame to excel_file without ever leaving a half-written workbook.
+
+    The sheet is written next to the target and swapped in with os.replace, so a crash
+    or a reader opening the file mid-export sees either the old or the new workbook.
+    """
+    tmp_file = excel_file + ".tmp.xlsx"
+    df.to_excel(tmp_file, index=False, engine='openpyxl')
+    os.replace(tmp_file, excel_file)
@@ -0,0 +1,185 @@
+# face_matcher.py
+
+import argparse
+import time
+import numpy as np
+from encodings_store import STORE_DIR, load_store
+
+# --- Configuration ---
+TOLERANCE = 0.6
+MATCH_STRATEGY = "exhaustive"   # "exhaustive" = every sample; the scanners all use this switch
+                                # "prototype" = per-student prototypes + top-k re-rank (large cohorts)
+                                # "ivf" = approximate nearest-neighbour index (campus-scale galleries)
+PROTOTYPE_MODE = "mean"         # "mean" or "medoid"
+PROTOTYPE_TOP_K = 5             # Students re-ranked against their individual samples
+# ---------------------
+
+class GalleryMatcher:
+    """Matches face encodings against the whole gallery with one matrix operation.
+
+    The gallery is held as a contiguous float32 matrix with its squared row norms
+    precomputed, so scoring a frame costs a single (faces x 128) @ (128 x gallery)
+    product instead of one Python-list-to-array conversion per face.
+    """
+
+    def __init__(self, encodings, names, tolerance=TOLERANCE):
+        self.gallery = np.ascontiguousarray(np.asarray(encodings, dtype=np.float32).reshape(-1, 128))
+        self.names = list(names)
+        self.tolerance = tolerance
+        self.gallery_sq_norms = np.einsum('ij,ij->i', self.gallery, self.gallery)
+
+    def __len__(self):
+        return len(self.names)
+
+    def distances(self, face_encodings):
+        """Returns the (faces x gallery) matrix of Euclidean distances."""
+        queries = np.asarray(face_encodings, dtype=np.float32).reshape(-1, 128)
+        query_sq_norms = np.einsum('ij,ij->i', queries, queries)
+        sq_dist = query_sq_norms[:, None] + self.gallery_sq_norms[None, :] - 2.0 * (queries @ self.gallery.T)
+        # Rounding can push near-identical pairs slightly below zero.
+        np.maximum(sq_dist, 0.0, out=sq_dist)
+        return np.sqrt(sq_dist)
+
+    def search(self, face_encodings):
+        """Returns (best gallery index, distance) arrays, one entry per face."""
+        if len(face_encodings) == 0 or len(self) == 0:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)
+
+        dist = self.distances(face_encodings)
+        best = np.argmin(dist, axis=1)
+        return best, dist[np.arange(len(best)), best]
+
+    def match(self, face_encodings):
+        """Returns (identifier or None, distance) for every face, None meaning no match within tolerance."""
+        best, best_dist = self.search(face_encodings)
+        return [
+            (self.names[index] if distance <= self.tolerance else None, float(distance))
+            for index, distance in zip(best, best_dist)
+        ]
+
+
+class PrototypeMatcher(GalleryMatcher):
+    """Two-stage matcher: score per-student prototypes first, then re-rank the top-k.
+
+    Each student folder contributes several samples (one per captured image), so the
+    prototype stage scans one row per student instead of one per image. Only the
+    samples of the top_k closest students are compared exactly.
+    """
+
+    def __init__(self, encodings, names, tolerance=TOLERANCE, mode=PROTOTYPE_MODE, top_k=PROTOTYPE_TOP_K):
+        super().__init__(encodings, names, tolerance)
+        self.mode = mode
+        self.top_k = top_k
+
+        identities = {}
+        for row, name in enumerate(self.names):
+            identities.setdefault(name, []).append(row)
+        self.members = [np.asarray(rows, dtype=np.intp) for rows in identities.values()]
+
+        prototypes = [self._prototype(rows) for rows in self.members]
+        self.prototypes = GalleryMatcher(prototypes, list(identities), tolerance)
+
+    def _prototype(self, rows):
+        samples = self.gallery[rows]
+        if self.mode == "medoid" and len(rows) > 2:
+            # The sample with the smallest total distance to the other samples of the student.
+            within = GalleryMatcher(samples, rows).distances(samples)
+            return samples[np.argmin(within.sum(axis=1))]
+        return samples.mean(axis=0)
+
+    def search(self, face_encodings):
+        if len(face_encodings) == 0 or len(self) == 0:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)
+
+        queries = np.asarray(face_encodings, dtype=np.float32).reshape(-1, 128)
+        proto_dist = self.prototypes.distances(queries)
+        k = min(self.top_k, proto_dist.shape[1])
+        candidates = np.argpartition(proto_dist, k - 1, axis=1)[:, :k]
+
+        best = np.empty(len(queries), dtype=np.intp)
+        best_dist = np.empty(len(queries), dtype=np.float32)
+        for i, query in enumerate(queries):
+            rows = np.concatenate([self.members[p] for p in candidates[i]])
+            sample_dist = self.gallery[rows] - query
+            sample_dist = np.sqrt(np.einsum('ij,ij->i', sample_dist, sample_dist))
+            j = np.argmin(sample_dist)
+            best[i] = rows[j]
+            best_dist[i] = sample_dist[j]
+        return best, best_dist
+
+
+def build_matcher(encodings, names, strategy=MATCH_STRATEGY, tolerance=TOLERANCE):
+    """Returns the matcher selected by strategy."""
+    if strategy == "prototype":
+        return PrototypeMatcher(encodings, names, tolerance)
+    if strategy == "exhaustive":
+        return GalleryMatcher(encodings, names, tolerance)
+    if strategy == "ivf":
+        # Imported here: ann_index builds on this module.
+        from ann_index import load_or_build_index
+        return load_or_build_index(encodings, names, tolerance)
+    raise ValueError(f"Unknown match strategy: {strategy}")
+
+
+def compare_matchers(reference, candidate, queries, expected_names, repeats=5):
+    """Compares a candidate matcher with the reference (exhaustive) one on the same queries.
+
+    Returns a dict with per-query latency (ms) for both matchers, the identity accuracy of
+    each, and how often the candidate picks the same identity as the reference.
+    """
+    report = {}
+    results = {}
+    for label, matcher in (("reference", reference), ("candidate", candidate)):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            best, _ = matcher.search(queries)
+        elapsed = time.perf_counter() - start
+        results[label] = [matcher.names[index] for index in best]
+        report[f"{label}_ms_per_query"] = 1000.0 * elapsed / (repeats * max(1, len(queries)))
+        report[f"{label}_accuracy"] = float(np.mean([a == b for a, b in zip(results[label], expected_names)]))
+
+    report["agreement"] = float(np.mean([a == b for a, b in zip(results["reference"], results["candidate"])]))
+    report["queries"] = len(queries)
+    return report
+
+
+def holdout_split(encodings, names):
+    """Holds out the last sample of every student with at least two samples as a query."""
+    last_row = {name: row for row, name in enumerate(names)}
+    counts = {}
+    for name in names:
+        counts[name] = counts.get(name, 0) + 1
+
+    held_out = {row for name, row in last_row.items() if counts[name] > 1}
+    gallery = [(enc, name) for row, (enc, name) in enumerate(zip(encodings, names)) if row not in held_out]
+    queries = [(encodings[row], names[row]) for row in sorted(held_out)]
+    return gallery, queries
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Accuracy/latency report: prototype matching vs exhaustive matching.")
+    parser.add_argument("--store", default=STORE_DIR, help="encodings store to evaluate")
+    parser.add_argument("--mode", default=PROTOTYPE_MODE, choices=["mean", "medoid"])
+    parser.add_argument("--top-k", type=int, default=PROTOTYPE_TOP_K)
+    args = parser.parse_args()
+
+    encodings, names, _ = load_store(args.store)
+    if encodings is None:
+        raise SystemExit(f"[ERROR] No encodings store in {args.store}/.")
+
+    gallery, queries = holdout_split(encodings, names)
+    if not gallery or not queries:
+        raise SystemExit("[ERROR] Need at least one student with two or more samples.")
+
+    gallery_encodings, gallery_names = zip(*gallery)
+    query_encodings, query_names = zip(*queries)
+
+    reference = GalleryMatcher(gallery_encodings, gallery_names)
+    candidate = PrototypeMatcher(gallery_encodings, gallery_names, mode=args.mode, top_k=args.top_k)
+    report = compare_matchers(reference, candidate, np.asarray(query_encodings), query_names)
+
+    print(f"--- Prototype ({args.mode}, top-{args.top_k}) vs exhaustive: {report['queries']} held-out queries ---")
+    print(f"Gallery: {len(reference)} samples | {len(candidate.members)} students")
+    print(f"Exhaustive: {report['reference_ms_per_query']:.4f} ms/query | accuracy {report['reference_accuracy']:.2%}")
+    print(f"Prototype : {report['candidate_ms_per_query']:.4f} ms/query | accuracy {report['candidate_accuracy']:.2%}")
+    print(f"Agreement with exhaustive: {report['agreement']:.2%}")
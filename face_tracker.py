@@ -0,0 +1,157 @@
+# face_tracker.py
+
+import itertools
+import cv2
+
+# --- Configuration ---
+IOU_THRESHOLD = 0.3            # Minimum overlap for a detection to continue a track
+MAX_MISSES = 5                 # Detection rounds a track survives without a matching box
+REVERIFY_INTERVAL = 3.0        # Seconds before a confirmed track is encoded again
+CONFIRM_MATCHES = 3            # Consecutive same-identity encodings before a track is confirmed (and logged)
+CONFIRM_RETRY_INTERVAL = 0.25  # Seconds before a recognized but unconfirmed track is encoded again
+UNKNOWN_RETRY_INTERVAL = 0.5   # Seconds before an unrecognized track is encoded again
+USE_CORRELATION_TRACKER = False  # Move boxes with OpenCV trackers on frames without detection
+# ---------------------
+
+def iou(a, b):
+    """Intersection over union of two (top, right, bottom, left) boxes."""
+    top, right = max(a[0], b[0]), min(a[1], b[1])
+    bottom, left = min(a[2], b[2]), max(a[3], b[3])
+    inter = max(0, bottom - top) * max(0, right - left)
+    area_a = (a[2] - a[0]) * (a[1] - a[3])
+    area_b = (b[2] - b[0]) * (b[1] - b[3])
+    union = area_a + area_b - inter
+    return inter / union if union > 0 else 0.0
+
+def _create_cv_tracker():
+    """Returns a new OpenCV single-object tracker, or None if this build has none."""
+    for factory in ("legacy.TrackerMOSSE_create", "TrackerKCF_create", "TrackerMIL_create"):
+        module = cv2
+        try:
+            for attr in factory.split("."):
+                module = getattr(module, attr)
+            return module()
+        except AttributeError:
+            continue
+    return None
+
+
+class Track:
+    """One face followed across frames. Boxes are in full-frame coordinates."""
+
+    def __init__(self, track_id, box):
+        self.track_id = track_id
+        self.box = box
+        self.identifier = None    # Gallery identifier, None until recognized
+        self.distance = None
+        self.last_encoded = None  # Time of the last encoding, None if never encoded
+        self.confirmations = 0    # Consecutive encodings that matched the current identifier
+        self.misses = 0
+        self.cv_tracker = None
+        self.cv_scale = None      # Resize factor of the image the OpenCV tracker was started on
+
+    def assign(self, identifier, distance, now):
+        if identifier is None:
+            self.confirmations = 0
+        elif identifier == self.identifier:
+            self.confirmations += 1
+        else:
+            self.confirmations = 1
+        self.identifier = identifier
+        self.distance = distance
+        self.last_encoded = now
+
+
+class IoUTracker:
+    """Associates detected boxes with existing tracks by greedy IoU matching."""
+
+    def __init__(self, iou_threshold=IOU_THRESHOLD, max_misses=MAX_MISSES,
+                 reverify_interval=REVERIFY_INTERVAL, unknown_retry_interval=UNKNOWN_RETRY_INTERVAL,
+                 confirm_matches=CONFIRM_MATCHES, confirm_retry_interval=CONFIRM_RETRY_INTERVAL,
+                 use_correlation=USE_CORRELATION_TRACKER):
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.reverify_interval = reverify_interval
+        self.unknown_retry_interval = unknown_retry_interval
+        self.confirm_matches = confirm_matches
+        self.confirm_retry_interval = confirm_retry_interval
+        self.use_correlation = use_correlation
+        self.tracks = []
+        self._ids = itertools.count(1)
+
+    def update(self, boxes, image=None, scale=None):
+        """Matches boxes to tracks and returns the track for every box, in box order.
+
+        If correlation tracking is enabled, `image` (resized by `scale`) is used to
+        restart each track's OpenCV tracker at its detected position.
+        """
+        pairs = sorted(
+            ((iou(track.box, box), t, b) for t, track in enumerate(self.tracks) for b, box in enumerate(boxes)),
+            reverse=True,
+        )
+        assigned = [None] * len(boxes)
+        used_tracks = set()
+        for overlap, t, b in pairs:
+            if overlap < self.iou_threshold:
+                break
+            if t in used_tracks or assigned[b] is not None:
+                continue
+            used_tracks.add(t)
+            assigned[b] = self.tracks[t]
+
+        for t, track in enumerate(self.tracks):
+            if t not in used_tracks:
+                track.misses += 1
+        self.tracks = [track for track in self.tracks if track.misses <= self.max_misses]
+
+        for b, box in enumerate(boxes):
+            track = assigned[b]
+            if track is None:
+                track = Track(next(self._ids), box)
+                self.tracks.append(track)
+                assigned[b] = track
+            track.box = box
+            track.misses = 0
+            if self.use_correlation and image is not None:
+                self._start_cv_tracker(track, image, scale)
+        return assigned
+
+    def _start_cv_tracker(self, track, image, scale):
+        track.cv_tracker = _create_cv_tracker()
+        if track.cv_tracker is None:
+            print("[WARN] This OpenCV build has no correlation tracker. Disabling it.")
+            self.use_correlation = False
+            return
+        top, right, bottom, left = (int(v * scale) for v in track.box)
+        track.cv_tracker.init(image, (left, top, max(1, right - left), max(1, bottom - top)))
+        track.cv_scale = scale
+
+    def predict(self, image, scale):
+        """Moves every track with its OpenCV tracker on a frame where detection did not run."""
+        if not self.use_correlation:
+            return
+        for track in self.tracks:
+            if track.cv_tracker is None or track.cv_scale != scale:
+                continue
+            ok, (x, y, w, h) = track.cv_tracker.update(image)
+            if ok:
+                track.box = tuple(int(v / scale) for v in (y, x + w, y + h, x))
+            else:
+                track.cv_tracker = None
+
+    def needs_encoding(self, track, now):
+        """True for new tracks and for tracks due another encoding.
+
+        Unrecognized tracks are retried every unknown_retry_interval, recognized ones
+        every confirm_retry_interval until confirm_matches encodings agreed, and
+        confirmed ones only every reverify_interval.
+        """
+        if track.last_encoded is None:
+            return True
+        if track.identifier is None:
+            interval = self.unknown_retry_interval
+        elif track.confirmations < self.confirm_matches:
+            interval = self.confirm_retry_interval
+        else:
+            interval = self.reverify_interval
+        return now - track.last_encoded >= interval
@@ -0,0 +1,232 @@
+# frame_recognizer.py
+
+import threading
+import time
+import cv2
+import face_recognition
+from batch_encoder import encode_batch
+from face_tracker import IoUTracker
+from scanner_metrics import get_metrics
+
+# --- Configuration ---
+DETECTION_SCALE = 0.25     # Frames are shrunk by this factor before detection
+DETECTION_INTERVAL = 1     # Run HOG detection on every Nth frame; tracks carry the boxes in between
+DETECTION_UPSAMPLE = 1     # number_of_times_to_upsample passed to face_locations
+# ---------------------
+
+class FrameRecognizer:
+    """Detects, tracks and recognizes the faces of one video source.
+
+    Detection runs on every frame handed in (every DETECTION_INTERVAL-th frame), but
+    the expensive 128-d encoding only runs for tracks that are new, still unrecognized,
+    or due for re-verification; the other tracks keep the identity they already have.
+
+    Several pool workers may call process() for the same source. Detection runs
+    outside the lock; the tracker update is serialized. A detection is dropped
+    (process() returns None) only if a newer detection was already applied, and a
+    predict-only frame only if the tracks already reflect a newer frame.
+
+    With an AdaptiveController, scale, upsampling and detection interval come from
+    the controller and every frame's processing time is fed back to it. With a
+    MotionGate, frames that show no change while no face is being tracked are
+    skipped before any resizing or detection.
+
+    Each face is returned as (box, identifier, distance, confirmed), where confirmed
+    is True only in the result of a frame that encoded the face and found the track's
+    identity agreeing with at least CONFIRM_MATCHES encodings in a row. A track merely
+    carrying its identity over reports confirmed=False.
+
+    on_stage, if given, is called as on_stage(stage, seconds) for the "resize",
+    "detect", "encode" and "match" stages of every frame that reaches them.
+
+    process() handles one frame. process_batch() splits the same work into
+    prepare() and complete() so the faces of several frames, possibly from several
+    sources, are encoded in one batch and matched with one matrix operation.
+    """
+
+    def __init__(self, matcher_source, tracker=None, scale=DETECTION_SCALE, detection_interval=DETECTION_INTERVAL,
+                 upsample=DETECTION_UPSAMPLE, controller=None, motion_gate=None, on_stage=None):
+        self.matcher_source = matcher_source   # () -> current matcher (hot-reloaded)
+        self.tracker = tracker or IoUTracker()
+        self.scale = scale
+        self.detection_interval = detection_interval
+        self.upsample = upsample
+        self.controller = controller
+        self.motion_gate = motion_gate
+        self.on_stage = on_stage
+        self._lock = threading.Lock()
+        self._last_claimed = -1
+        self._last_detection = -1           # Last frame claimed for detection
+        self._last_detection_applied = -1   # Last frame whose detection updated the tracker
+        self._last_predicted = -1           # Last frame that only moved the tracks
+
+    def _report_stage(self, stage, seconds):
+        if self.on_stage is not None:
+            self.on_stage(stage, seconds)
+        metrics = get_metrics()
+        if metrics is not None:
+            metrics.observe_stage(stage, seconds)
+
+    def _timed(self, stage, function, *args):
+        start = time.perf_counter()
+        result = function(*args)
+        self._report_stage(stage, time.perf_counter() - start)
+        return result
+
+    def _shrink(self, frame, scale):
+        small_frame = cv2.resize(frame, (0, 0), fx=scale, fy=scale)
+        return cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
+
+    def _faces(self, encoded_tracks=()):
+        confirm_matches = self.tracker.confirm_matches
+        return [(track.box, track.identifier, track.distance,
+                 track in encoded_tracks and track.confirmations >= confirm_matches)
+                for track in self.tracker.tracks if track.misses == 0]
+
+    def _feed_controller(self, faces, seconds):
+        if self.controller is not None and faces is not None:
+            scale = self.controller.settings()[0]
+            heights = [(bottom - top) * scale for (top, _, bottom, _), _, _, _ in faces]
+            self.controller.record(seconds, heights)
+
+    def process(self, frame_id, frame):
+        """Returns a list of ((top, right, bottom, left), identifier or None, distance, confirmed) in full-frame coordinates."""
+        start = time.perf_counter()
+        prepared = self.prepare(frame_id, frame)
+        if isinstance(prepared, PendingEncodings):
+            encodings = self._timed("encode", encode_batch, [prepared.item()])[0]
+            matches = self._timed("match", self.matcher_source().match, encodings)
+            prepared = self.complete(prepared, matches)
+        self._feed_controller(prepared, time.perf_counter() - start)
+        return prepared
+
+    def prepare(self, frame_id, frame):
+        """Runs everything up to encoding.
+
+        Returns the finished face list (or None for a dropped frame) when nothing needs
+        encoding, otherwise a PendingEncodings to be finished with complete().
+        """
+        if self.controller is not None:
+            scale, upsample, detection_interval = self.controller.settings()
+        else:
+            scale, upsample, detection_interval = self.scale, self.upsample, self.detection_interval
+
+        with self._lock:
+            if frame_id <= self._last_claimed:
+                return None
+            self._last_claimed = frame_id
+            # Every frame goes through the gate so its background model stays current.
+            if self.motion_gate is not None and not self.motion_gate.has_motion(frame) and not self.tracker.tracks:
+                self.motion_gate.mark_skipped()
+                metrics = get_metrics()
+                if metrics is not None:
+                    metrics.inc("frames_motion_skipped")
+                return []
+
+        rgb_small_frame = self._timed("resize", self._shrink, frame, scale)
+
+        with self._lock:
+            detect = frame_id - self._last_detection >= detection_interval or not self.tracker.tracks
+            if not detect:
+                # Never move the tracks back to an older frame; a detection still running
+                # for an older frame is not affected by this frame at all.
+                if frame_id < max(self._last_predicted, self._last_detection_applied):
+                    return None
+                self.tracker.predict(rgb_small_frame, scale)
+                self._last_predicted = frame_id
+                return self._faces()
+            self._last_detection = frame_id
+
+        face_locations = self._timed("detect", face_recognition.face_locations, rgb_small_frame, upsample)
+        boxes = [tuple(int(v / scale) for v in location) for location in face_locations]
+        metrics = get_metrics()
+        if metrics is not None:
+            metrics.inc("faces_detected", len(face_locations))
+
+        with self._lock:
+            # Only a newer detection makes this one stale.
+            if frame_id < self._last_detection_applied:
+                return None
+            self._last_detection_applied = frame_id
+            now = time.time()
+            tracks = self.tracker.update(boxes, rgb_small_frame, scale)
+
+            pending = [(track, location) for track, location in zip(tracks, face_locations)
+                       if self.tracker.needs_encoding(track, now)]
+            if not pending:
+                return self._faces()
+            # Claim the tracks now so a worker on a newer frame does not encode them again.
+            for track, _ in pending:
+                track.last_encoded = now
+            return PendingEncodings(self, rgb_small_frame, pending, now)
+
+    def complete(self, prepared, matches):
+        """Assigns the (identifier, distance) matches of a PendingEncodings and returns the face list."""
+        metrics = get_metrics()
+        with self._lock:
+            for (track, _), (full_identifier, distance) in zip(prepared.pending, matches):
+                track.assign(full_identifier, distance, prepared.now)
+                if metrics is not None:
+                    metrics.inc("faces_recognized" if full_identifier is not None else "faces_unknown")
+                    metrics.observe_distance(distance)
+            return self._faces([track for track, _ in prepared.pending])
+
+
+class PendingEncodings:
+    """Faces of one prepared frame that still need encoding and matching."""
+
+    def __init__(self, recognizer, image, pending, now):
+        self.recognizer = recognizer
+        self.image = image
+        self.pending = pending   # [(track, location in the detection image)]
+        self.now = now
+
+    def item(self):
+        return self.image, [location for _, location in self.pending]
+
+
+def process_batch(jobs):
+    """Processes [(recognizer, frame_id, frame)] with one encoding batch and one match per gallery.
+
+    Returns the face list (or None) of every job, in order.
+    """
+    start = time.perf_counter()
+    results = [recognizer.prepare(frame_id, frame) for recognizer, frame_id, frame in jobs]
+    prepared = [(i, result) for i, result in enumerate(results) if isinstance(result, PendingEncodings)]
+
+    if prepared:
+        encode_start = time.perf_counter()
+        encodings = encode_batch([result.item() for _, result in prepared])
+        encode_seconds = time.perf_counter() - encode_start
+
+        # Sources normally share one hot-reloaded matcher: group by it and match each group at once.
+        groups = {}
+        for (i, result), face_encodings in zip(prepared, encodings):
+            matcher = result.recognizer.matcher_source()
+            groups.setdefault(id(matcher), (matcher, []))[1].append((i, result, face_encodings))
+
+        match_start = time.perf_counter()
+        for matcher, members in groups.values():
+            stacked = [encoding for _, _, face_encodings in members for encoding in face_encodings]
+            matches = matcher.match(stacked)
+            offset = 0
+            for i, result, face_encodings in members:
+                results[i] = result.recognizer.complete(result, matches[offset:offset + len(face_encodings)])
+                offset += len(face_encodings)
+        match_seconds = time.perf_counter() - match_start
+
+        # Each recognizer is charged its share of the batch by face count, so the
+        # stage totals add up to the time actually spent.
+        faces = {}
+        for _, result in prepared:
+            faces[result.recognizer] = faces.get(result.recognizer, 0) + len(result.pending)
+        total_faces = sum(faces.values())
+        for recognizer, count in faces.items():
+            recognizer._report_stage("encode", encode_seconds * count / total_faces)
+            recognizer._report_stage("match", match_seconds * count / total_faces)
+
+    # The controller budgets per frame, so each frame is charged its share of the batch.
+    share = (time.perf_counter() - start) / len(jobs)
+    for (recognizer, _, _), faces in zip(jobs, results):
+        recognizer._feed_controller(faces, share)
+    return results
@@ -0,0 +1,58 @@
+# gallery_watcher.py
+
+import threading
+from encodings_store import STORE_DIR, load_store, read_current
+
+# --- Configuration ---
+POLL_INTERVAL = 2.0   # Seconds between checks of the store's CURRENT pointer
+# ---------------------
+
+class GalleryWatcher:
+    """Keeps a matcher in sync with the encodings store while the scanner runs.
+
+    A background thread polls the store's CURRENT pointer; when encode_faces publishes
+    a new generation or appends rows, the new gallery is mapped and its matcher built on
+    that thread, then swapped in with a single attribute assignment. The capture loop
+    just reads `watcher.matcher` once per frame and never waits for a reload.
+    """
+
+    def __init__(self, build_matcher, matcher=None, current=None, store_dir=STORE_DIR, interval=POLL_INTERVAL):
+        self.build_matcher = build_matcher   # (encodings, names) -> matcher
+        self.matcher = matcher
+        self.store_dir = store_dir
+        self.interval = interval
+        self._version = self._key(current)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="GalleryWatcher", daemon=True)
+
+    @staticmethod
+    def _key(current):
+        return None if current is None else (current["generation"], current["count"])
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def reload_if_changed(self):
+        """Loads and swaps in the gallery if the store changed. Returns True on swap."""
+        try:
+            if self._key(read_current(self.store_dir)) == self._version:
+                return False
+            encodings, names, current = load_store(self.store_dir)
+            matcher = self.build_matcher(encodings, names)
+        except Exception as e:
+            # A half-published or unreadable store is retried on the next poll.
+            print(f"[WARN] Gallery reload failed: {e}")
+            return False
+
+        self.matcher = matcher
+        self._version = self._key(current)
+        print(f"[INFO] Gallery reloaded: {len(names)} encodings (generation {current['generation']})")
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.reload_if_changed()
@@ -1,59 +1,125 @@
 # main_app.py (FINAL & SYNCED CODE)
+#
+# Only Tk is imported up front so the menu appears at once. registration,
+# attendance_log and ttkbootstrap are imported when first needed. While the menu is
+# shown, a Warmup thread (startup_warmup.py) imports attendance_log and the heavy
+# libraries, loads the gallery and opens the camera; registration and ttkbootstrap
+# are only imported on the Tk thread.
+#
+#   python main_app.py --startup-benchmark   # print startup timings and exit
 
+import time
+_PROCESS_START = time.perf_counter()
+
+import argparse
 import tkinter as tk
 from tkinter import messagebox
-from ttkbootstrap import Style
-from ttkbootstrap.constants import * 
-from registration import RegistrationWindow
-from attendance_log import run_attendance_system
+from types import SimpleNamespace
+from startup_warmup import Warmup
+
+# ttkbootstrap 'flatly' colours, hard-coded so the menu does not need ttkbootstrap loaded.
+FLATLY_COLORS = SimpleNamespace(primary="#2c3e50", secondary="#95a5a6", success="#18bc9c", info="#3498db",
+                                warning="#f39c12", danger="#e74c3c", light="#ecf0f1", dark="#7b8a8b")
 
 class MainApplication(tk.Tk):
     def __init__(self):
         super().__init__()
-        
-        self.style = Style(theme='flatly') 
-        
+
+        self.colors = FLATLY_COLORS
+        self._style = None   # ttkbootstrap Style, created on first use (see style)
+
         self.title("Face Attendance System")
         self.geometry("450x280")
         self.resizable(False, False)
-        
+
         self.create_widgets()
+        self.warmup = Warmup().start()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    @property
+    def style(self):
+        if self._style is None:
+            from ttkbootstrap import Style
+            self._style = Style(theme='flatly')
+        return self._style
 
     def create_widgets(self):
         main_frame = tk.Frame(self)
-        main_frame.pack(pady=30, padx=20, fill="both", expand=True) 
-
-        tk.Label(main_frame, text="ATTENDANCE CAPTURE SYSTEM", 
-                 font=('Arial', 18, 'bold'), 
-                 fg=self.style.colors.primary).pack(pady=10)
-        
-        tk.Button(main_frame, text="1. NEW STUDENT REGISTRATION", command=self.open_registration, 
-                  width=30, height=2, 
-                  bg=self.style.colors.warning, fg='white', 
-                  font=('Arial', 10, 'bold')).pack(pady=15, fill=tk.X) 
-                  
-        tk.Button(main_frame, text="2. START ATTENDANCE SCAN", command=self.start_attendance, 
-                  width=30, height=2, 
-                  bg=self.style.colors.success, fg='white', 
-                  font=('Arial', 10, 'bold')).pack(pady=10, fill=tk.X) 
+        main_frame.pack(pady=30, padx=20, fill="both", expand=True)
+
+        tk.Label(main_frame, text="ATTENDANCE CAPTURE SYSTEM",
+                 font=('Arial', 18, 'bold'),
+                 fg=self.colors.primary).pack(pady=10)
+
+        tk.Button(main_frame, text="1. NEW STUDENT REGISTRATION", command=self.open_registration,
+                  width=30, height=2,
+                  bg=self.colors.warning, fg='white',
+                  font=('Arial', 10, 'bold')).pack(pady=15, fill=tk.X)
+
+        tk.Button(main_frame, text="2. START ATTENDANCE SCAN", command=self.start_attendance,
+                  width=30, height=2,
+                  bg=self.colors.success, fg='white',
+                  font=('Arial', 10, 'bold')).pack(pady=10, fill=tk.X)
 
     def open_registration(self):
+        from registration import RegistrationWindow
+        # Registration opens the webcam itself; hand it back from the warm-up first.
+        self.warmup.release_camera()
         self.withdraw()
         reg_root = tk.Toplevel(self)
-        reg_root.style = self.style 
-        RegistrationWindow(reg_root, self.style) 
+        reg_root.style = self.style
+        RegistrationWindow(reg_root, self.style)
         reg_root.protocol("WM_DELETE_WINDOW", lambda: self.show_main_window(reg_root))
-        
+
     def start_attendance(self):
+        from attendance_log import run_attendance_system
         messagebox.showinfo("System Alert", "Starting Attendance Scanner. Press 'q' on the camera window to quit.")
-        self.withdraw() 
-        run_attendance_system()
-        self.deiconify() 
-        
+        self.withdraw()
+        # Usually finished while the menu was shown; if not, waiting here is no slower than loading now.
+        self.warmup.wait()
+        run_attendance_system(self.warmup.take_capture(), self.warmup.take_watcher())
+        self.deiconify()
+        # Prepare the gallery and camera again for the next scan.
+        self.warmup.start()
+
     def show_main_window(self, window_to_destroy):
         window_to_destroy.destroy()
-        self.deiconify() 
+        self.deiconify()
+        self.warmup.start()
 
-if __name__ == "__main__":
+    def on_close(self):
+        self.warmup.close()
+        self.destroy()
+
+def benchmark_startup():
+    """Prints how long the menu takes to appear and how long each warm-up step takes."""
     app = MainApplication()
-    app.mainloop()
\ No newline at end of file
+    app.update()
+    menu_shown = time.perf_counter() - _PROCESS_START
+
+    def finish():
+        if not app.warmup.done:
+            app.after(50, finish)
+            return
+        ready = time.perf_counter() - _PROCESS_START
+        print("--- Startup benchmark ---")
+        print(f"Menu shown after: {menu_shown * 1000:.0f} ms")
+        for stage, seconds in app.warmup.timings.items():
+            print(f"  {stage:>28}: {seconds * 1000:.0f} ms")
+        print(f"Scanner ready after: {ready * 1000:.0f} ms")
+        app.on_close()
+
+    app.after(0, finish)
+    app.mainloop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Face Attendance System menu.")
+    parser.add_argument("--startup-benchmark", action="store_true",
+                        help="print menu and warm-up timings, then exit")
+    args = parser.parse_args()
+
+    if args.startup_benchmark:
+        benchmark_startup()
+    else:
+        app = MainApplication()
+        app.mainloop()
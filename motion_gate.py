@@ -0,0 +1,49 @@
+# motion_gate.py
+
+import cv2
+
+# --- Configuration ---
+THUMBNAIL_SIZE = (64, 48)    # Grayscale thumbnail compared between frames
+PIXEL_THRESHOLD = 18         # Grey-level change for a thumbnail pixel to count as changed
+MOTION_FRACTION = 0.01       # Share of changed pixels that counts as motion (lower = more sensitive)
+BACKGROUND_RATE = 0.05       # How fast the background model absorbs the scene
+# ---------------------
+
+class MotionGate:
+    """Cheap presence check run before face detection.
+
+    Each frame is shrunk to a blurred grayscale thumbnail and compared with a running
+    background average; if too few pixels changed, detection can be skipped.
+    """
+
+    def __init__(self, pixel_threshold=PIXEL_THRESHOLD, motion_fraction=MOTION_FRACTION,
+                 background_rate=BACKGROUND_RATE):
+        self.pixel_threshold = pixel_threshold
+        self.motion_fraction = motion_fraction
+        self.background_rate = background_rate
+        self.frames = 0
+        self.skipped = 0
+        self._background = None
+
+    def has_motion(self, frame):
+        """Updates the background model and returns True if the frame differs from it."""
+        thumbnail = cv2.resize(frame, THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+        thumbnail = cv2.cvtColor(thumbnail, cv2.COLOR_BGR2GRAY)
+        thumbnail = cv2.GaussianBlur(thumbnail, (5, 5), 0)
+        self.frames += 1
+
+        if self._background is None:
+            self._background = thumbnail.astype("float32")
+            return True
+
+        diff = cv2.absdiff(thumbnail, cv2.convertScaleAbs(self._background))
+        changed = cv2.countNonZero(cv2.threshold(diff, self.pixel_threshold, 255, cv2.THRESH_BINARY)[1])
+        cv2.accumulateWeighted(thumbnail, self._background, self.background_rate)
+        return changed >= self.motion_fraction * thumbnail.size
+
+    def mark_skipped(self):
+        self.skipped += 1
+
+    def __str__(self):
+        share = 100.0 * self.skipped / self.frames if self.frames else 0.0
+        return f"motion gate: skipped {self.skipped}/{self.frames} frames ({share:.0f}%)"
@@ -0,0 +1,178 @@
+# multi_camera.py
+#
+# Headless attendance server for several entrances at once:
+#
+#   python multi_camera.py 0 1 rtsp://10.0.0.5/stream entrance.mp4
+#
+# Every source gets its own capture thread, tracker and motion gate, but all of them
+# feed one shared pool of recognition workers and one copy of the encodings gallery.
+# A worker takes the frames already queued from several entrances together, so their
+# faces are encoded in one batch and matched against the gallery in one operation.
+
+import argparse
+import time
+import cv2
+from attendance_log import (ADAPTIVE_CONTROL, METRICS_ENABLED, METRICS_HTTP_PORT, MOTION_GATING,
+                            LogCooldown, close_journal, log_attendance, open_gallery,
+                            open_journal)
+from adaptive_control import AdaptiveController
+from frame_recognizer import FrameRecognizer, process_batch
+from motion_gate import MotionGate
+from scanner_metrics import disable_metrics, enable_metrics
+from scanner_pipeline import BATCH_FRAMES, RECOGNITION_WORKERS, FrameGrabber, LatencyStats, RecognitionPool
+
+# --- Configuration ---
+STATUS_INTERVAL = 10.0   # Seconds between per-camera status lines
+# ---------------------
+
+def parse_source(source):
+    """Camera indices are given as plain integers; anything else is a URL or file path."""
+    return int(source) if source.isdigit() else source
+
+
+def recognize_batch(cameras, jobs):
+    """Runs [((position, frame_id), frame)] from any cameras through one batched pass."""
+    start = time.perf_counter()
+    results = process_batch([(cameras[position].recognizer, frame_id, frame) for (position, frame_id), frame in jobs])
+    share = (time.perf_counter() - start) / len(jobs)
+    for (position, _), _ in jobs:
+        cameras[position].recognition_stats.record(share)
+    return results
+
+
+def handle_results(cameras, results):
+    """Counts [((position, frame_id), faces)] per camera and logs the confirmed matches."""
+    for (position, _), faces in results:
+        camera = cameras[position]
+        camera.results += 1
+        camera.faces += len(faces)
+        for _, full_identifier, _, confirmed in faces:
+            if full_identifier is None:
+                continue
+            camera.recognized += 1
+            if confirmed and camera.cooldown.should_log(full_identifier):
+                message = log_attendance(full_identifier)
+                camera.logged += 1
+                print(f"[{camera.label}] {message}")
+
+
+class CameraSource:
+    """One entrance: its capture thread, recognizer and counters."""
+
+    def __init__(self, index, source, matcher_source):
+        self.index = index
+        self.label = f"cam{index}"
+        self.source = source
+        self.capture = cv2.VideoCapture(parse_source(source))
+        self.grabber = FrameGrabber(self.capture, name=f"{self.label}-capture")
+        self.recognizer = FrameRecognizer(
+            matcher_source,
+            controller=AdaptiveController() if ADAPTIVE_CONTROL else None,
+            motion_gate=MotionGate() if MOTION_GATING else None,
+        )
+        self.recognition_stats = LatencyStats(f"{self.label}-recognition")
+        self.cooldown = LogCooldown()
+        self.frame_id = -1
+        self.submitted = 0
+        self.dropped = 0
+        self.results = 0
+        self.faces = 0
+        self.recognized = 0
+        self.logged = 0
+
+    def status(self, elapsed):
+        captured = self.grabber.stats.count
+        return (f"[{self.label}] {self.source} | capture {captured / elapsed:.1f} fps | "
+                f"recognized {self.results / elapsed:.1f} fps | dropped {self.dropped} | "
+                f"{self.recognition_stats} | faces {self.faces} | matched {self.recognized} | logged {self.logged}")
+
+
+def run_multi_camera(sources, workers=RECOGNITION_WORKERS, batch_frames=BATCH_FRAMES):
+    """Runs headless recognition over all sources until interrupted or every source ends."""
+    # Headless: no message boxes, problems are printed.
+    watcher = open_gallery(report_errors=False)
+    if watcher is None:
+        return
+
+    cameras = []
+    for index, source in enumerate(sources):
+        camera = CameraSource(index, source, lambda: watcher.matcher)
+        if not camera.capture.isOpened():
+            print(f"[ERROR] Could not open source {source}. Skipping it.")
+            continue
+        cameras.append(camera)
+
+    if not cameras:
+        watcher.stop()
+        return
+
+    # Journal writer, one-time Excel import and duplicate index start before any frame.
+    open_journal()
+    # One job slot per camera keeps a busy entrance from starving the others.
+    pool = RecognitionPool(None, workers=workers, queue_size=len(cameras),
+                           recognize_batch=lambda jobs: recognize_batch(cameras, jobs),
+                           batch_frames=batch_frames).start()
+    for camera in cameras:
+        camera.grabber.start()
+
+    print(f"--- Multi-camera attendance: {len(cameras)} source(s), {workers} worker(s) --- (Ctrl+C to quit)")
+    if METRICS_ENABLED:
+        enable_metrics(http_port=METRICS_HTTP_PORT)
+    start_time = last_status = time.time()
+    turn = 0
+    try:
+        while not all(camera.grabber.ended for camera in cameras):
+            submitted = False
+            # Rotate the starting camera so every source gets first pick of free slots.
+            for offset in range(len(cameras)):
+                position = (turn + offset) % len(cameras)
+                camera = cameras[position]
+                frame_id, frame = camera.grabber.wait_for_frame(camera.frame_id, timeout=0)
+                if frame is None:
+                    continue
+                camera.frame_id = frame_id
+                if pool.submit((position, frame_id), frame):
+                    camera.submitted += 1
+                    submitted = True
+                else:
+                    camera.dropped += 1
+            turn += 1
+
+            handle_results(cameras, pool.results())
+
+            now = time.time()
+            if now - last_status >= STATUS_INTERVAL:
+                for camera in cameras:
+                    print(camera.status(now - start_time))
+                last_status = now
+
+            if not submitted:
+                time.sleep(0.005)
+    except KeyboardInterrupt:
+        pass
+
+    for camera in cameras:
+        camera.grabber.stop()
+        camera.capture.release()
+    pool.stop()
+    # Frames still being recognized at shutdown can hold confirmed matches.
+    handle_results(cameras, pool.results())
+    watcher.stop()
+    close_journal()
+    disable_metrics()
+
+    elapsed = max(1e-9, time.time() - start_time)
+    for camera in cameras:
+        print(camera.status(elapsed))
+    print("Multi-camera attendance closed.")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Headless attendance over several cameras, RTSP streams or video files.")
+    parser.add_argument("sources", nargs="+", help="camera index, RTSP/HTTP URL or video file")
+    parser.add_argument("--workers", type=int, default=RECOGNITION_WORKERS, help="shared recognition threads")
+    parser.add_argument("--batch-frames", type=int, default=BATCH_FRAMES,
+                        help="most queued frames encoded together by one worker (1 disables batching)")
+    args = parser.parse_args()
+
+    run_multi_camera(args.sources, args.workers, args.batch_frames)
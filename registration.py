@@ -3,21 +3,24 @@
 import cv2
 import os
 import time
-import pandas as pd
 import tkinter as tk
 from tkinter import messagebox, Toplevel, W, E
 import tkinter.ttk as ttk # <-- CRITICAL FIX: Standard ttk import for Progressbar
 from ttkbootstrap import Style
 from ttkbootstrap.constants import *
+from capture_quality import CaptureQualityChecker
 from encode_faces import create_encodings 
 from PIL import Image, ImageTk
+from scanner_pipeline import FrameGrabber
+from student_registry import REGISTRY_FILE, folder_name, get_registry
+import queue
 import threading 
 
 # --- Configuration ---
 DATA_PATH = "Data_Set"
-DETAILS_FILE = "student_details.xlsx"
 IMAGES_TO_CAPTURE = 5     
-CAPTURE_INTERVAL = 1.0     
+CAPTURE_INTERVAL = 1.0     # Minimum seconds between accepted images
+DISPLAY_INTERVAL_MS = 30   # Preview refresh; the Tk thread only draws, it never reads the camera
 # ---------------------
 
 if not os.path.exists(DATA_PATH):
@@ -88,41 +91,26 @@ class RegistrationWindow:
 
         # Create unique identifier and folder name logic
         student_id = details["Ticket Number (ID)"]
-        name_clean = details["Full Name"].replace(" ", "_")
-        dept_clean = details["Department"].replace(" ", "_")
-        section_clean = details["Section (A/B)"].replace(" ", "_")
-        
-        self.folder_name = f"{student_id}_{name_clean}_{dept_clean}_{section_clean}"
+        self.folder_name = folder_name(student_id, details["Full Name"], details["Department"], details["Section (A/B)"])
         self.student_folder = os.path.join(DATA_PATH, self.folder_name)
 
-        if os.path.exists(self.student_folder):
+        # A ticket imported from a roster has no images yet and may still be enrolled.
+        existing = get_registry().get(student_id)
+        if os.path.exists(self.student_folder) or \
+                (existing is not None and os.path.exists(os.path.join(DATA_PATH, existing.folder))):
             messagebox.showerror("Error", f"Student ID {student_id} already exists. Check the ID.")
             return
 
         os.makedirs(self.student_folder)
         
-        self.save_details_to_excel(details)
+        self.save_details(details)
         self.capture_images_window()
         
-    def save_details_to_excel(self, details):
-        """Appends the student details to the main Excel sheet."""
-        
-        details_df = pd.DataFrame([details])
-
-        existing_df = pd.DataFrame()
-        if os.path.exists(DETAILS_FILE):
-            try:
-                existing_df = pd.read_excel(DETAILS_FILE, engine='openpyxl')
-            except ValueError:
-                 print(f"[WARN] Existing {DETAILS_FILE} is corrupted or empty. Creating new.")
-
-        if not existing_df.empty:
-            updated_df = pd.concat([existing_df, details_df], ignore_index=True)
-        else:
-            updated_df = details_df
-
-        updated_df.to_excel(DETAILS_FILE, index=False, engine='openpyxl')
-        print(f"[SUCCESS] Student details saved to {DETAILS_FILE}")
+    def save_details(self, details):
+        """Adds or updates the student in the registry (one indexed row, no workbook rewrite)."""
+        get_registry().upsert(details["Ticket Number (ID)"], details["Full Name"], details["Department"],
+                              details["Section (A/B)"], self.folder_name)
+        print(f"[SUCCESS] Student details saved to {REGISTRY_FILE}")
 
     def capture_images_window(self):
         """Shows loading screen, then initiates camera capture via thread."""
@@ -162,69 +150,151 @@ class RegistrationWindow:
         self.camera_label = tk.Label(capture_win, relief=tk.SUNKEN) 
         self.camera_label.pack(padx=10, pady=10)
 
+        self.hint_label = tk.Label(capture_win, text="", font=('Arial', 10, 'bold'))
+        self.hint_label.pack(pady=(0, 10))
+
         self.image_count = 0
-        self.start_time = time.time()
-        
+        self.capture_hint = "Starting capture..."
+        self.images_saved = False
+        self.frame_id = -1
+        self.save_queue = queue.Queue()
+        self.grabber = FrameGrabber(self.cap, name="registration").start()
+        self.checker = CaptureQualityChecker()
+
+        # Quality checks and JPEG writes run on worker threads; see capture_images/write_images.
+        threading.Thread(target=self.capture_images, name="RegistrationCapture", daemon=True).start()
+        threading.Thread(target=self.write_images, name="RegistrationWriter", daemon=True).start()
+
         self.update_camera_frame(capture_win)
         self.master.withdraw() 
         
 
+    def capture_images(self):
+        """Worker thread: checks the newest frames and queues the good ones for saving."""
+        last_id = -1
+        next_capture = time.time() + CAPTURE_INTERVAL
+
+        while self.image_count < IMAGES_TO_CAPTURE and not self.grabber.ended:
+            delay = next_capture - time.time()
+            if delay > 0:
+                time.sleep(delay)
+
+            last_id, frame = self.grabber.wait_for_frame(last_id, timeout=0.5)
+            if frame is None:
+                continue
+
+            try:
+                accepted, reason = self.checker.check(frame)
+            except Exception as e:
+                print(f"[WARN] Quality check failed: {e}")
+                continue
+
+            if not accepted:
+                # Rejected frames are retried right away with the next camera frame.
+                self.capture_hint = reason
+                continue
+
+            image_filename = os.path.join(self.student_folder, f"{self.image_count+1}.jpg")
+            self.save_queue.put((image_filename, frame))
+            self.image_count += 1
+            self.capture_hint = f"Captured image {self.image_count}/{IMAGES_TO_CAPTURE}"
+            print(self.capture_hint)
+            next_capture = time.time() + CAPTURE_INTERVAL
+
+        self.save_queue.put(None)
+
+    def write_images(self):
+        """Worker thread: writes the accepted frames to the student's folder."""
+        while True:
+            item = self.save_queue.get()
+            if item is None:
+                break
+            image_filename, frame = item
+            if not cv2.imwrite(image_filename, frame):
+                print(f"[ERROR] Could not write {image_filename}")
+        self.images_saved = True
+
     def update_camera_frame(self, capture_win):
-        """Reads frame, saves image periodically, and updates GUI."""
-        ret, frame = self.cap.read()
-        
-        if ret:
-            # 1. Image Saving Logic
-            current_time = time.time()
-            
-            if current_time - self.start_time >= CAPTURE_INTERVAL and self.image_count < IMAGES_TO_CAPTURE:
-                image_filename = os.path.join(self.student_folder, f"{self.image_count+1}.jpg")
-                
-                cv2.imwrite(image_filename, frame) 
-                self.image_count += 1
-                self.start_time = current_time
-                print(f"Captured image {self.image_count}/{IMAGES_TO_CAPTURE}")
-                
-            # Draw a progress indicator on the frame
-            cv2.putText(frame, f"Capturing: {self.image_count}/{IMAGES_TO_CAPTURE}", (10, 30), 
-                        cv2.FONT_HERSHEY_DUPLEX, 0.8, (0, 255, 0), 2)
-
-            # 2. Display live feed (convert OpenCV frame to Tkinter format)
+        """Shows the newest frame and progress; the workers do the reading and saving."""
+        if self.images_saved and self.image_count >= IMAGES_TO_CAPTURE:
+            self.stop_camera()
+            self.finish_capture(capture_win)
+            return
+
+        if self.grabber.ended:
+            self.stop_camera()
+            messagebox.showerror("Camera Error", "Failed to read from camera.")
+            capture_win.destroy()
+            return
+
+        frame_id, frame = self.grabber.wait_for_frame(self.frame_id, timeout=0)
+        if frame is not None:
+            self.frame_id = frame_id
+
+            # Convert and shrink first: drawing on the shared frame would end up in the saved image.
             cv2_img = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
             img = cv2.resize(cv2_img, (320, 240)) 
-            
+            cv2.putText(img, f"Capturing: {self.image_count}/{IMAGES_TO_CAPTURE}", (10, 25), 
+                        cv2.FONT_HERSHEY_DUPLEX, 0.6, (0, 255, 0), 2)
+
             img_pil = Image.fromarray(img)
             img_tk = ImageTk.PhotoImage(image=img_pil)
             
             self.camera_label.imgtk = img_tk
             self.camera_label.configure(image=img_tk)
+            self.hint_label.configure(text=self.capture_hint)
 
-            # 3. Check for Finish Condition
-            if self.image_count < IMAGES_TO_CAPTURE:
-                self.master.after(10, lambda: self.update_camera_frame(capture_win))
-            else:
-                self.cap.release()
-                self.finish_capture(capture_win)
-        else:
-            messagebox.showerror("Camera Error", "Failed to read from camera.")
-            self.cap.release()
-            capture_win.destroy()
+        self.master.after(DISPLAY_INTERVAL_MS, lambda: self.update_camera_frame(capture_win))
+
+    def stop_camera(self):
+        self.grabber.stop()
+        self.cap.release()
 
 
     def finish_capture(self, capture_win):
         """Cleans up and shows the Finish button."""
         self.camera_label.destroy()
+        self.hint_label.destroy()
         
         tk.Label(capture_win, text="Capture Complete! Encoded data will be saved.", 
                  fg=self.style.colors.success, font=('Arial', 14, 'bold')).pack(pady=10)
         
-        tk.Button(capture_win, text="FINISH & SAVE ENCODINGS", command=lambda: self.final_finish(capture_win), 
+        self.finish_button = tk.Button(capture_win, text="FINISH & SAVE ENCODINGS", command=lambda: self.final_finish(capture_win), 
                bg=self.style.colors.info, fg='white', 
-               font=('Arial', 11, 'bold')).pack(pady=20)
+               font=('Arial', 11, 'bold'))
+        self.finish_button.pack(pady=20)
                
     def final_finish(self, capture_win):
-        """Runs the encoding script and closes windows."""
-        create_encodings() 
+        """Encodes the new images on a worker thread while the window shows progress."""
+        self.finish_button.configure(state=tk.DISABLED)
+
+        self.encoding_progress = ttk.Progressbar(capture_win, orient=tk.HORIZONTAL, mode='determinate', length=250)
+        self.encoding_progress.pack(pady=(0, 5))
+        self.encoding_label = tk.Label(capture_win, text="Encoding images...", font=('Arial', 10))
+        self.encoding_label.pack(pady=(0, 15))
+
+        encode_thread = threading.Thread(target=self.encode_in_background, args=(capture_win,), daemon=True)
+        encode_thread.start()
+
+    def encode_in_background(self, capture_win):
+        """Worker thread: incremental encoding, reporting progress through the Tk event loop."""
+        progress = lambda done, total: self.master.after(0, lambda: self.show_encoding_progress(done, total))
+        try:
+            create_encodings(incremental=True, progress=progress)
+            error = None
+        except Exception as e:
+            error = str(e)
+        self.master.after(0, lambda: self.encoding_finished(capture_win, error))
+
+    def show_encoding_progress(self, done, total):
+        self.encoding_progress.configure(maximum=total, value=done)
+        self.encoding_label.configure(text=f"Encoding images... {done}/{total}")
+
+    def encoding_finished(self, capture_win, error):
+        """Called by the main thread when the background encoding is done."""
         capture_win.destroy()
-        messagebox.showinfo("Success", f"{self.folder_name} registered and encoded successfully!")
-        self.master.destroy()
\ No newline at end of file
+        if error is not None:
+            messagebox.showerror("Encoding Error", f"Images were saved but encoding failed: {error}")
+        else:
+            messagebox.showinfo("Success", f"{self.folder_name} registered and encoded successfully!")
+        self.master.destroy()
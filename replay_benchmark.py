@@ -0,0 +1,218 @@
+# replay_benchmark.py
+#
+# Runs the scanner's detection, matching and logging pipeline over recorded video
+# files or folders of frames, without a webcam, and writes a benchmark report:
+#
+#   python replay_benchmark.py clips/entrance.mp4 frames/lab_door --truth truth.csv
+#
+# Ground truth is an optional CSV with columns source,frame,identifiers where source
+# is the file/folder name, frame is the video frame index (or the image path relative
+# to the folder) and identifiers is a ';'-separated list of Data_Set folder names.
+
+import argparse
+import csv
+import json
+import os
+import time
+from collections import defaultdict
+import cv2
+import numpy as np
+from attendance_journal import JOURNAL_FILE
+from attendance_log import (ADAPTIVE_CONTROL, MOTION_GATING, TOLERANCE,
+                            LogCooldown, close_journal, log_attendance, open_journal)
+from adaptive_control import AdaptiveController
+from encodings_store import load_store
+from face_matcher import MATCH_STRATEGY, build_matcher
+from frame_recognizer import FrameRecognizer
+from motion_gate import MotionGate
+
+# --- Configuration ---
+REPLAY_JOURNAL_FILE = "replay_journal.csv"   # Keeps benchmark runs out of the real attendance journal
+REPORT_FILE = "replay_report.json"
+DEFAULT_FPS = 30.0                           # Pacing for image folders and videos without FPS metadata
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+STAGES = ["resize", "detect", "encode", "match", "log", "frame"]
+# ---------------------
+
+def iter_frames(source):
+    """Yields (frame key, BGR frame) from a video file or an image folder; also returns its FPS."""
+    if os.path.isdir(source):
+        paths = sorted(
+            os.path.join(root, filename)
+            for root, _, filenames in os.walk(source)
+            for filename in filenames if filename.lower().endswith(IMAGE_EXTENSIONS)
+        )
+
+        def images():
+            for path in paths:
+                frame = cv2.imread(path)
+                if frame is not None:
+                    yield os.path.relpath(path, source).replace(os.sep, "/"), frame
+        return images(), DEFAULT_FPS
+
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        raise IOError(f"Could not open {source}")
+    fps = capture.get(cv2.CAP_PROP_FPS) or DEFAULT_FPS
+
+    def video():
+        index = 0
+        try:
+            while True:
+                ret, frame = capture.read()
+                if not ret:
+                    return
+                yield str(index), frame
+                index += 1
+        finally:
+            capture.release()
+    return video(), fps
+
+def load_truth(truth_file):
+    """Returns {(source, frame key): set of identifiers}."""
+    truth = {}
+    with open(truth_file, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            identifiers = {name for name in (row.get("identifiers") or "").split(";") if name}
+            truth[(row["source"], row["frame"])] = identifiers
+    return truth
+
+def percentiles(samples):
+    if not samples:
+        return {"count": 0}
+    ms = 1000.0 * np.asarray(samples)
+    return {
+        "count": len(samples),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p90_ms": float(np.percentile(ms, 90)),
+        "p99_ms": float(np.percentile(ms, 99)),
+    }
+
+def score(predictions, truth):
+    """Face-level precision/recall and exact-frame accuracy over the labelled frames."""
+    true_pos = false_pos = false_neg = exact = evaluated = 0
+    for key, expected in truth.items():
+        if key not in predictions:
+            continue   # Skipped by pacing or motion gating before any result existed
+        predicted = predictions[key]
+        true_pos += len(predicted & expected)
+        false_pos += len(predicted - expected)
+        false_neg += len(expected - predicted)
+        exact += predicted == expected
+        evaluated += 1
+    return {
+        "labelled_frames": len(truth),
+        "evaluated_frames": evaluated,
+        "precision": true_pos / (true_pos + false_pos) if true_pos + false_pos else None,
+        "recall": true_pos / (true_pos + false_neg) if true_pos + false_neg else None,
+        "exact_frame_accuracy": exact / evaluated if evaluated else None,
+    }
+
+def replay(sources, realtime=False, truth=None, journal_file=REPLAY_JOURNAL_FILE,
+           adaptive=ADAPTIVE_CONTROL, motion_gating=MOTION_GATING):
+    """Replays the sources through the pipeline and returns the report dict."""
+    encodings, names, _ = load_store()
+    if encodings is None or len(encodings) == 0:
+        raise SystemExit("[ERROR] No face encodings loaded. Run registration first.")
+    matcher = build_matcher(encodings, names, MATCH_STRATEGY, TOLERANCE)
+
+    timings = defaultdict(list)
+    record_stage = lambda stage, seconds: timings[stage].append(seconds)
+    predictions = {}
+    frames = processed = skipped = 0
+    # Start each run from an empty replay journal so earlier runs do not suppress its log writes.
+    if journal_file != JOURNAL_FILE and os.path.exists(journal_file):
+        os.remove(journal_file)
+    open_journal(journal_file)
+
+    start_time = time.perf_counter()
+    for source in sources:
+        label = os.path.basename(os.path.normpath(source))
+        recognizer = FrameRecognizer(
+            lambda: matcher,
+            controller=AdaptiveController() if adaptive else None,
+            motion_gate=MotionGate() if motion_gating else None,
+            on_stage=record_stage,
+        )
+        cooldown = LogCooldown()
+        frame_iter, fps = iter_frames(source)
+        source_start = time.perf_counter()
+
+        for index, (key, frame) in enumerate(frame_iter):
+            frames += 1
+            if realtime:
+                # Behave like a live camera: wait for the frame's time, drop frames we are late for.
+                due = source_start + index / fps
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                elif -delay > 1.0 / fps:
+                    skipped += 1
+                    continue
+
+            frame_start = time.perf_counter()
+            faces = recognizer.process(index, frame)
+            for _, full_identifier, _, confirmed in faces:
+                if full_identifier is not None and confirmed and cooldown.should_log(full_identifier):
+                    log_start = time.perf_counter()
+                    log_attendance(full_identifier)
+                    record_stage("log", time.perf_counter() - log_start)
+            record_stage("frame", time.perf_counter() - frame_start)
+
+            predictions[(label, key)] = {ident for _, ident, _, _ in faces if ident is not None}
+            processed += 1
+
+    elapsed = time.perf_counter() - start_time
+    close_journal()
+
+    report = {
+        "sources": list(sources),
+        "pacing": "realtime" if realtime else "max",
+        "settings": {"match_strategy": MATCH_STRATEGY, "adaptive": adaptive, "motion_gating": motion_gating,
+                     "gallery": len(names)},
+        "frames": frames,
+        "processed": processed,
+        "skipped": skipped,
+        "seconds": elapsed,
+        "fps": processed / elapsed if elapsed > 0 else 0.0,
+        "stages": {stage: percentiles(timings[stage]) for stage in STAGES},
+    }
+    if truth is not None:
+        report["accuracy"] = score(predictions, truth)
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Replay recorded video/frames through the scanner pipeline and benchmark it.")
+    parser.add_argument("sources", nargs="+", help="video files or folders of frames")
+    parser.add_argument("--realtime", action="store_true", help="pace frames at the source FPS instead of as fast as possible")
+    parser.add_argument("--truth", help="ground-truth CSV (source,frame,identifiers)")
+    parser.add_argument("--report", default=REPORT_FILE, help=f"where to write the JSON report (default: {REPORT_FILE})")
+    parser.add_argument("--journal", default=REPLAY_JOURNAL_FILE, help="attendance journal used for the replay's log writes")
+    parser.add_argument("--no-adaptive", action="store_true", help="disable the adaptive controller")
+    parser.add_argument("--no-motion-gate", action="store_true", help="disable motion gating")
+    args = parser.parse_args()
+
+    report = replay(
+        args.sources,
+        realtime=args.realtime,
+        truth=load_truth(args.truth) if args.truth else None,
+        journal_file=args.journal,
+        adaptive=ADAPTIVE_CONTROL and not args.no_adaptive,
+        motion_gating=MOTION_GATING and not args.no_motion_gate,
+    )
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"--- Replay: {report['processed']}/{report['frames']} frames in {report['seconds']:.2f} s "
+          f"({report['fps']:.1f} fps, {report['pacing']} pacing) ---")
+    for stage, stats in report["stages"].items():
+        if stats["count"]:
+            print(f"{stage:>7}: p50 {stats['p50_ms']:.1f} ms | p90 {stats['p90_ms']:.1f} ms | "
+                  f"p99 {stats['p99_ms']:.1f} ms | n={stats['count']}")
+    if "accuracy" in report:
+        accuracy = report["accuracy"]
+        print(f"Accuracy: precision {accuracy['precision']} | recall {accuracy['recall']} | "
+              f"exact frames {accuracy['exact_frame_accuracy']} over {accuracy['evaluated_frames']} frames")
+    print(f"[INFO] Report written to {args.report}")
@@ -0,0 +1,191 @@
+# scanner_metrics.py
+#
+# Opt-in instrumentation for the scanner hot path: stage timers kept in ring buffers,
+# event counters and a match-distance histogram. Snapshots can be appended to a local
+# JSON-lines file periodically and served as Prometheus text on localhost.
+#
+# Instrumented code calls get_metrics() and does nothing when it returns None, so the
+# cost with metrics disabled is one global lookup per hook.
+
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- Configuration ---
+RING_SIZE = 1024                 # Latency samples kept per stage
+DUMP_FILE = "scanner_metrics.jsonl"
+DUMP_INTERVAL = 60.0             # Seconds between snapshots appended to DUMP_FILE
+HTTP_HOST = "127.0.0.1"          # Never exposed beyond the local machine
+DISTANCE_BUCKETS = [0.2, 0.3, 0.4, 0.45, 0.5, 0.55, 0.6, 0.7, 0.8, 1.0]
+# ---------------------
+
+_metrics = None
+
+def get_metrics():
+    """Returns the active recorder, or None when instrumentation is off."""
+    return _metrics
+
+def enable_metrics(dump_file=DUMP_FILE, dump_interval=DUMP_INTERVAL, http_port=None):
+    """Starts instrumentation; returns the recorder."""
+    global _metrics
+    if _metrics is None:
+        _metrics = MetricsRecorder()
+        _metrics.start(dump_file, dump_interval, http_port)
+    return _metrics
+
+def disable_metrics():
+    """Stops the background dump/HTTP threads, writing one last snapshot."""
+    global _metrics
+    if _metrics is not None:
+        _metrics.stop()
+        _metrics = None
+
+
+class _StageRing:
+    def __init__(self, size):
+        self.samples = deque(maxlen=size)
+        self.count = 0
+        self.total = 0.0
+
+
+class MetricsRecorder:
+    """Thread-safe store for stage timings, counters and the distance histogram."""
+
+    def __init__(self, ring_size=RING_SIZE):
+        self.ring_size = ring_size
+        self.started = time.time()
+        self._stages = {}
+        self._counters = {}
+        self._buckets = [0] * (len(DISTANCE_BUCKETS) + 1)
+        self._distance_sum = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._dump_thread = None
+        self._server = None
+
+    # --- Recording (hot path) ---
+
+    def observe_stage(self, stage, seconds):
+        with self._lock:
+            ring = self._stages.get(stage)
+            if ring is None:
+                ring = self._stages[stage] = _StageRing(self.ring_size)
+            ring.samples.append(seconds)
+            ring.count += 1
+            ring.total += seconds
+
+    def inc(self, counter, amount=1):
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + amount
+
+    def observe_distance(self, distance):
+        with self._lock:
+            for i, bound in enumerate(DISTANCE_BUCKETS):
+                if distance <= bound:
+                    self._buckets[i] += 1
+                    break
+            else:
+                self._buckets[-1] += 1
+            self._distance_sum += distance
+
+    # --- Reporting ---
+
+    def snapshot(self):
+        with self._lock:
+            stages = {name: (sorted(ring.samples), ring.count, ring.total) for name, ring in self._stages.items()}
+            counters = dict(self._counters)
+            buckets = list(self._buckets)
+            distance_sum = self._distance_sum
+
+        def quantile(samples, q):
+            return samples[min(len(samples) - 1, int(q * len(samples)))] if samples else 0.0
+
+        return {
+            "time": time.time(),
+            "uptime": time.time() - self.started,
+            "stages": {
+                name: {
+                    "count": count,
+                    "sum": total,
+                    "p50": quantile(samples, 0.5),
+                    "p95": quantile(samples, 0.95),
+                    "p99": quantile(samples, 0.99),
+                }
+                for name, (samples, count, total) in stages.items()
+            },
+            "counters": counters,
+            "match_distance": {"buckets": DISTANCE_BUCKETS, "counts": buckets, "sum": distance_sum},
+        }
+
+    def prometheus_text(self):
+        snap = self.snapshot()
+        lines = ["# TYPE scanner_stage_seconds summary"]
+        for name, stage in sorted(snap["stages"].items()):
+            for q, key in (("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99")):
+                lines.append(f'scanner_stage_seconds{{stage="{name}",quantile="{q}"}} {stage[key]:.6f}')
+            lines.append(f'scanner_stage_seconds_sum{{stage="{name}"}} {stage["sum"]:.6f}')
+            lines.append(f'scanner_stage_seconds_count{{stage="{name}"}} {stage["count"]}')
+
+        lines.append("# TYPE scanner_events_total counter")
+        for name, value in sorted(snap["counters"].items()):
+            lines.append(f'scanner_events_total{{event="{name}"}} {value}')
+
+        lines.append("# TYPE scanner_match_distance histogram")
+        cumulative = 0
+        histogram = snap["match_distance"]
+        for bound, count in zip(histogram["buckets"] + ["+Inf"], histogram["counts"]):
+            cumulative += count
+            lines.append(f'scanner_match_distance_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f"scanner_match_distance_sum {histogram['sum']:.6f}")
+        lines.append(f"scanner_match_distance_count {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, dump_file):
+        with open(dump_file, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.snapshot()) + "\n")
+
+    # --- Background exporters ---
+
+    def start(self, dump_file, dump_interval, http_port):
+        if dump_file:
+            self._dump_thread = threading.Thread(target=self._dump_loop, args=(dump_file, dump_interval),
+                                                 name="MetricsDump", daemon=True)
+            self._dump_thread.start()
+        if http_port:
+            self._server = ThreadingHTTPServer((HTTP_HOST, http_port), _handler_for(self))
+            threading.Thread(target=self._server.serve_forever, name="MetricsHTTP", daemon=True).start()
+            print(f"[INFO] Metrics served at http://{HTTP_HOST}:{http_port}/metrics")
+
+    def stop(self):
+        self._stop.set()
+        if self._dump_thread is not None:
+            self._dump_thread.join(timeout=2.0)
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def _dump_loop(self, dump_file, interval):
+        while not self._stop.wait(interval):
+            self.dump(dump_file)
+        self.dump(dump_file)
+
+
+def _handler_for(recorder):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") != "/metrics":
+                self.send_error(404)
+                return
+            body = recorder.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass   # Keep scrapes out of the scanner's console
+
+    return MetricsHandler
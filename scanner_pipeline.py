@@ -0,0 +1,206 @@
+# scanner_pipeline.py
+#
+# Threaded frame pipeline for the attendance scanner:
+#
+#   FrameGrabber ──(newest frame only)──> RecognitionPool ──(results)──> display loop
+#
+# The grabber keeps only the newest frame, so the preview runs at camera FPS while
+# recognition takes whatever frames it has capacity for. Frames wait in a bounded job
+# queue; results are never dropped, since the display loop drains them every frame.
+# Each stage keeps its own latency statistics.
+
+import queue
+import threading
+import time
+from collections import deque
+from scanner_metrics import get_metrics
+
+# --- Configuration ---
+RECOGNITION_WORKERS = 2    # Threads running detection/encoding/matching
+RECOGNITION_QUEUE = 2      # Frames waiting for a worker; newer frames are dropped when full
+LATENCY_WINDOW = 120       # Samples kept per stage for the latency statistics
+BATCH_FRAMES = 4           # Most queued frames one worker takes at once when batching is enabled
+# ---------------------
+
+class LatencyStats:
+    """Rolling latency statistics for one pipeline stage."""
+
+    def __init__(self, name, window=LATENCY_WINDOW):
+        self.name = name
+        self.count = 0
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+        metrics = get_metrics()
+        if metrics is not None:
+            metrics.observe_stage(self.name, seconds)
+
+    def summary(self):
+        """Returns (mean ms, p95 ms) over the window."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return 0.0, 0.0
+        mean = sum(samples) / len(samples)
+        p95 = samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+        return 1000.0 * mean, 1000.0 * p95
+
+    def __str__(self):
+        mean_ms, p95_ms = self.summary()
+        return f"{self.name}: {mean_ms:.1f} ms (p95 {p95_ms:.1f})"
+
+
+class FrameGrabber:
+    """Reads a capture source on its own thread and holds only the newest frame."""
+
+    def __init__(self, capture, name="capture"):
+        self.capture = capture
+        self.stats = LatencyStats(name)
+        self.dropped = 0       # Frames replaced before anyone read them
+        self.ended = False     # The source stopped returning frames
+        self._frame = None
+        self._frame_id = -1
+        self._read_id = -1
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"FrameGrabber-{name}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+
+    def _run(self):
+        while not self._stop.is_set():
+            start = time.perf_counter()
+            ret, frame = self.capture.read()
+            if not ret:
+                break
+            self.stats.record(time.perf_counter() - start)
+
+            with self._condition:
+                if self._frame_id != self._read_id:
+                    self.dropped += 1
+                self._frame = frame
+                self._frame_id += 1
+                self._condition.notify_all()
+
+        with self._condition:
+            self.ended = True
+            self._condition.notify_all()
+
+    def wait_for_frame(self, last_id, timeout=0.1):
+        """Blocks until a frame newer than last_id arrives; returns (frame_id, frame).
+
+        Returns (last_id, None) on timeout or when the source has ended.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._frame_id > last_id or self.ended, timeout)
+            if self._frame_id <= last_id:
+                return last_id, None
+            self._read_id = self._frame_id
+            return self._frame_id, self._frame
+
+
+class RecognitionPool:
+    """Worker threads that run `recognize(tag, frame)` on submitted frames.
+
+    A recognizer may return None to drop a frame (e.g. one overtaken by a newer frame).
+
+    If recognize_batch is given (recognize may then be None), a worker that picks up
+    a frame also takes the frames already waiting behind it (up to batch_frames,
+    without waiting for more) and hands them to recognize_batch([(tag, frame), ...]),
+    which returns one result per frame.
+    """
+
+    def __init__(self, recognize, workers=RECOGNITION_WORKERS, queue_size=RECOGNITION_QUEUE,
+                 name="recognition", recognize_batch=None, batch_frames=BATCH_FRAMES):
+        self.recognize = recognize
+        self.recognize_batch = recognize_batch
+        self.batch_frames = max(1, batch_frames)
+        self.stats = LatencyStats(name)
+        self.dropped = 0       # Frames refused because every worker was busy
+        self._jobs = queue.Queue(maxsize=queue_size)
+        # Unbounded: every result may carry a confirmed match that must reach the logger, and
+        # the worker count already bounds how fast results arrive.
+        self._results = queue.Queue()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"RecognitionWorker-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        for _ in self._threads:
+            self._jobs.put(None)
+        for thread in self._threads:
+            thread.join(timeout=2.0)
+
+    def submit(self, tag, frame):
+        """Queues a frame without blocking; returns False (frame dropped) if the queue is full."""
+        try:
+            self._jobs.put_nowait((tag, frame))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def results(self):
+        """Returns every (tag, result) finished since the last call, oldest first."""
+        finished = []
+        while True:
+            try:
+                finished.append(self._results.get_nowait())
+            except queue.Empty:
+                return finished
+
+    def _take_batch(self, job):
+        """Adds the jobs already queued behind `job`; returns (jobs, stop requested)."""
+        jobs = [job]
+        while len(jobs) < self.batch_frames:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                return jobs, True
+            jobs.append(job)
+        return jobs, False
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            if self.recognize_batch is None:
+                jobs, stopping = [job], False
+            else:
+                jobs, stopping = self._take_batch(job)
+
+            start = time.perf_counter()
+            try:
+                if self.recognize_batch is None:
+                    results = [self.recognize(*job)]
+                else:
+                    results = self.recognize_batch(jobs)
+            except Exception as e:
+                print(f"[ERROR] Recognition failed: {e}")
+                results = []
+            elapsed = time.perf_counter() - start
+            for (tag, _), result in zip(jobs, results):
+                self.stats.record(elapsed / len(jobs))
+                if result is not None:
+                    self._results.put((tag, result))
+            if stopping:
+                return
@@ -0,0 +1,128 @@
+# startup_warmup.py
+#
+# Background warm-up for main_app: while the menu is on screen, a thread imports the
+# heavy modules (OpenCV, pandas, face_recognition and its dlib model files), loads the
+# encodings gallery and opens the camera, so the scanner starts without those delays.
+#
+# Only the standard library is imported here; everything heavy is imported on the
+# warm-up thread.
+
+import importlib
+import threading
+import time
+
+# --- Configuration ---
+# face_recognition loads the dlib models on import. ttkbootstrap, PIL.ImageTk and
+# registration are left to the Tk thread: ttkbootstrap patches tkinter's widget
+# classes on import, which must not happen while the mainloop is using them.
+WARM_MODULES = ["numpy", "cv2", "pandas", "face_recognition", "encodings_store", "face_matcher",
+                "attendance_log"]
+PRELOAD_GALLERY = True
+PREOPEN_CAMERA = True
+CAMERA_INDEX = 0
+# ---------------------
+
+class Warmup:
+    """Imports, gallery and camera prepared on a background thread.
+
+    The scanner takes ownership of the preloaded watcher and capture with
+    take_watcher()/take_capture(); anything not taken is released by close().
+    """
+
+    def __init__(self, modules=WARM_MODULES, preload_gallery=PRELOAD_GALLERY, preopen_camera=PREOPEN_CAMERA):
+        self.modules = modules
+        self.preload_gallery = preload_gallery
+        self.preopen_camera = preopen_camera
+        self.timings = {}       # {stage: seconds} for the startup benchmark
+        self._capture = None
+        self._watcher = None
+        self._camera_wanted = preopen_camera
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Starts (or restarts, after the scanner consumed the previous preload) the warm-up thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        with self._lock:
+            self._camera_wanted = self.preopen_camera
+        self._thread = threading.Thread(target=self._run, name="StartupWarmup", daemon=True)
+        self._thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        """Blocks until the warm-up thread is done; returns True if it finished."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.done
+
+    @property
+    def done(self):
+        return self._thread is not None and not self._thread.is_alive()
+
+    def _timed(self, stage, function, *args):
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        except Exception as e:
+            print(f"[WARN] Warm-up step '{stage}' failed: {e}")
+            return None
+        finally:
+            self.timings[stage] = time.perf_counter() - start
+
+    def _run(self):
+        start = time.perf_counter()
+        for module in self.modules:
+            self._timed(f"import {module}", importlib.import_module, module)
+
+        if self.preload_gallery and self._watcher is None:
+            attendance_log = importlib.import_module("attendance_log")
+            watcher = self._timed("gallery", attendance_log.open_gallery, False)
+            with self._lock:
+                self._watcher = watcher
+
+        if self._camera_wanted and self._capture is None:
+            capture = self._timed("camera", self._open_camera)
+            with self._lock:
+                # Registration may have asked for the camera while it was opening.
+                if capture is not None and not self._camera_wanted:
+                    capture.release()
+                    capture = None
+                self._capture = capture
+
+        self.timings["total"] = time.perf_counter() - start
+
+    def _open_camera(self):
+        import cv2
+        capture = cv2.VideoCapture(CAMERA_INDEX)
+        if not capture.isOpened():
+            capture.release()
+            print("[WARN] Could not pre-open the webcam; the scanner will retry.")
+            return None
+        return capture
+
+    def take_capture(self):
+        """Returns the pre-opened capture (or None); the caller now owns it."""
+        with self._lock:
+            capture, self._capture = self._capture, None
+            return capture
+
+    def take_watcher(self):
+        """Returns the started GalleryWatcher (or None); the caller now owns it."""
+        with self._lock:
+            watcher, self._watcher = self._watcher, None
+            return watcher
+
+    def release_camera(self):
+        """Frees the webcam for another user (e.g. registration) without waiting for the warm-up."""
+        with self._lock:
+            self._camera_wanted = False
+            capture, self._capture = self._capture, None
+        if capture is not None:
+            capture.release()
+
+    def close(self):
+        self.release_camera()
+        watcher = self.take_watcher()
+        if watcher is not None:
+            watcher.stop()
@@ -0,0 +1,207 @@
+# student_registry.py
+#
+# SQLite registry of enrolled students, keyed by ticket number. It is the system of
+# record for student details; student_details.xlsx is only written by an export.
+#
+#   python student_registry.py --import roster.xlsx    # bulk import a CSV/XLSX roster
+#   python student_registry.py --export                # write student_details.xlsx
+#
+# Every row is also held in memory, indexed by ticket and by Data_Set folder name (the
+# identifier the matchers return), so lookups on the scanner's hot path are dict hits.
+
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+import pandas as pd
+from excel_export import write_excel_atomic
+
+# --- Configuration ---
+REGISTRY_FILE = "student_registry.db"
+DETAILS_FILE = "student_details.xlsx"   # Excel export; also imported once if the registry is new
+RELOAD_CHECK_INTERVAL = 5.0             # Min seconds between checks for rows written by other processes
+# ---------------------
+
+Student = namedtuple("Student", ["ticket", "name", "department", "section", "folder"])
+
+# Column headers of the Excel export, in the layout the registration form always used.
+DETAILS_COLUMNS = ["Ticket Number (ID)", "Full Name", "Department", "Section (A/B)", "Folder"]
+
+# Roster headers (lower-cased) accepted by import_roster, mapped to Student fields.
+COLUMN_ALIASES = {
+    "ticket number (id)": "ticket", "ticket number": "ticket", "ticket": "ticket", "id": "ticket",
+    "full name": "name", "name": "name",
+    "department": "department", "dept": "department",
+    "section (a/b)": "section", "section": "section",
+    "folder": "folder",
+}
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def folder_name(ticket, name, department, section):
+    """Data_Set folder name for a student, e.g. '1001_Alex_Smith_CS_A'."""
+    parts = [ticket, name, department, section]
+    return "_".join(str(part).strip().replace(" ", "_") for part in parts)
+
+def parse_identifier(identifier):
+    """Best-effort Student from a folder name alone, for identifiers missing from the registry."""
+    parts = identifier.split('_')
+    if len(parts) < 4:
+        return Student(identifier, identifier, "N/A", "N/A", identifier)
+    return Student(parts[0], " ".join(parts[1:-2]), parts[-2], parts[-1], identifier)
+
+def get_registry():
+    """Returns the shared registry, opening it on first use."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = StudentRegistry()
+        return _registry
+
+
+class StudentRegistry:
+    """Students table plus in-memory indexes by ticket and by folder name."""
+
+    def __init__(self, db_file=REGISTRY_FILE, seed_from_details=True):
+        self.db_file = db_file
+        new_registry = not os.path.exists(db_file)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS students ("
+            "ticket TEXT PRIMARY KEY, name TEXT NOT NULL, department TEXT NOT NULL, "
+            "section TEXT NOT NULL, folder TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS students_folder ON students (folder)")
+        self._conn.commit()
+        self._load()
+
+        if new_registry and seed_from_details and os.path.exists(DETAILS_FILE):
+            # One-time migration from the workbook that used to be the system of record.
+            self.import_roster(DETAILS_FILE)
+
+    def _load(self):
+        rows = [Student(*row) for row in self._conn.execute(
+            "SELECT ticket, name, department, section, folder FROM students")]
+        # Swapped in whole, so readers on other threads never see a half-built index.
+        self._by_ticket = {student.ticket: student for student in rows}
+        self._by_folder = {student.folder: student for student in rows}
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        self._last_check = time.time()
+
+    def _reload_if_changed(self):
+        """Picks up rows committed by another process (e.g. registration while a scanner runs)."""
+        if time.time() - self._last_check < RELOAD_CHECK_INTERVAL:
+            return False
+        with self._lock:
+            self._last_check = time.time()
+            if self._conn.execute("PRAGMA data_version").fetchone()[0] != self._data_version:
+                self._load()
+                return True
+            return False
+
+    def __len__(self):
+        return len(self._by_ticket)
+
+    def get(self, ticket):
+        """Returns the Student with this ticket number, or None."""
+        student = self._by_ticket.get(str(ticket))
+        if student is None and self._reload_if_changed():
+            student = self._by_ticket.get(str(ticket))
+        return student
+
+    def lookup(self, identifier):
+        """Returns the Student for a gallery identifier (Data_Set folder name).
+
+        Falls back to the folder's ticket prefix, then to parsing the folder name, so
+        images enrolled before the registry existed still resolve.
+        """
+        student = self._by_folder.get(identifier)
+        if student is None and self._reload_if_changed():
+            student = self._by_folder.get(identifier)
+        if student is None:
+            student = self._by_ticket.get(identifier.split('_')[0])
+        return student if student is not None else parse_identifier(identifier)
+
+    def upsert(self, ticket, name, department, section, folder=None):
+        """Adds or updates one student; returns the stored Student."""
+        return self.upsert_many([(ticket, name, department, section, folder)])[0]
+
+    def upsert_many(self, rows):
+        """Adds or updates (ticket, name, department, section, folder or None) rows in one transaction.
+
+        A row without a folder keeps the student's existing folder, or gets the
+        folder_name() registration would have created.
+        """
+        with self._lock:
+            students = []
+            for ticket, name, department, section, folder in rows:
+                ticket = str(ticket).strip()
+                existing = self._by_ticket.get(ticket)
+                if not folder:
+                    folder = existing.folder if existing is not None else folder_name(ticket, name, department, section)
+                students.append(Student(ticket, str(name).strip(), str(department).strip(),
+                                        str(section).strip(), folder))
+
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO students (ticket, name, department, section, folder) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(ticket) DO UPDATE SET name = excluded.name, department = excluded.department, "
+                    "section = excluded.section, folder = excluded.folder",
+                    students,
+                )
+            self._load()
+            return students
+
+    def import_roster(self, roster_file):
+        """Bulk-imports a CSV or XLSX roster; returns the number of students imported."""
+        if roster_file.lower().endswith(".csv"):
+            roster_df = pd.read_csv(roster_file, dtype=str)
+        else:
+            roster_df = pd.read_excel(roster_file, engine='openpyxl', dtype=str)
+
+        roster_df = roster_df.rename(columns=lambda column: COLUMN_ALIASES.get(str(column).strip().lower(), column))
+        missing = {"ticket", "name", "department", "section"} - set(roster_df.columns)
+        if missing:
+            raise ValueError(f"{roster_file} has no column for: {', '.join(sorted(missing))}")
+        if "folder" not in roster_df.columns:
+            roster_df["folder"] = None
+
+        roster_df = roster_df.dropna(subset=["ticket"]).fillna({"name": "", "department": "", "section": ""})
+        rows = roster_df[["ticket", "name", "department", "section", "folder"]].itertuples(index=False, name=None)
+        students = self.upsert_many([(*row[:4], row[4] if isinstance(row[4], str) else None) for row in rows])
+        print(f"[INFO] Imported {len(students)} students from {roster_file} into {self.db_file}")
+        return len(students)
+
+    def export_to_excel(self, excel_file=DETAILS_FILE):
+        """Writes every student to an Excel sheet. Returns the number of rows exported."""
+        students = sorted(self._by_ticket.values())
+        details_df = pd.DataFrame(students, columns=Student._fields)
+        details_df.columns = DETAILS_COLUMNS
+
+        write_excel_atomic(details_df, excel_file)
+        print(f"[INFO] Exported {len(students)} students to {excel_file}")
+        return len(students)
+
+    def close(self):
+        self._conn.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Import a student roster into the registry or export it to Excel.")
+    parser.add_argument("--registry", default=REGISTRY_FILE)
+    parser.add_argument("--import", dest="roster", help="CSV or XLSX roster to bulk-import")
+    parser.add_argument("--export", nargs="?", const=DETAILS_FILE, help=f"write the registry to Excel (default: {DETAILS_FILE})")
+    args = parser.parse_args()
+
+    registry = StudentRegistry(args.registry)
+    if args.roster:
+        registry.import_roster(args.roster)
+    if args.export:
+        registry.export_to_excel(args.export)
+    if not args.roster and not args.export:
+        print(f"{len(registry)} students in {args.registry}")
+    registry.close()